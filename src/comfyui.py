@@ -0,0 +1,240 @@
+# Effacement du texte des bulles par diffusion (ComfyUI, workflow Flux Kontext)
+import io
+import json
+import uuid
+import threading
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+import websocket
+from PIL import Image
+
+DEFAULT_WORKFLOW = "notebooks/ComfyUiWorkflows/API-ModifImageFluxKontext.json"
+
+LOAD_NODE_TYPES = ("LoadImage", "LoadImageOutput")
+SAVE_NODE_TYPES = ("SaveImage", "JWImageSaveToPath")
+
+def load_workflow(workflow_path=DEFAULT_WORKFLOW):
+    """
+    Charge un workflow ComfyUI au format API et le prépare pour un usage en file d'attente :
+    - le nœud de chargement d'image devient un LoadImage (image envoyée via /upload/image),
+    - le nœud de sauvegarde devient un SaveImage (résultat récupéré via /history et /view).
+
+    Returns:
+    - (dict, str, str) : workflow, id du nœud de chargement, id du nœud de sauvegarde
+    """
+    with open(workflow_path, encoding="utf-8") as f:
+        workflow = json.load(f)
+
+    load_id = next((k for k, n in workflow.items() if n["class_type"] in LOAD_NODE_TYPES), None)
+    save_id = next((k for k, n in workflow.items() if n["class_type"] in SAVE_NODE_TYPES), None)
+    if load_id is None or save_id is None:
+        raise ValueError(f"Workflow sans nœud de chargement ou de sauvegarde d'image : {workflow_path}")
+
+    workflow[load_id] = {"inputs": {"image": None}, "class_type": "LoadImage"}
+    save_inputs = workflow[save_id]["inputs"]
+    workflow[save_id] = {
+        "inputs": {"images": save_inputs.get("images", save_inputs.get("image")), "filename_prefix": "traductionbd"},
+        "class_type": "SaveImage",
+    }
+    return workflow, load_id, save_id
+
+class ComfyUIEraser:
+    """
+    Client ComfyUI qui efface le texte de vignettes (crops de bulles) de façon asynchrone.
+
+    Une seule connexion websocket est ouverte pour toute la session. submit() envoie
+    la vignette, met le prompt en file d'attente et renvoie immédiatement un Future ;
+    un thread d'écoute résout chaque Future dès que ComfyUI signale la fin du prompt
+    correspondant (par prompt_id). Au plus max_queued prompts sont en attente à la fois.
+    """
+
+    def __init__(self, server="127.0.0.1:8188", workflow_path=DEFAULT_WORKFLOW, max_queued=4, timeout=600):
+        self.server = server
+        self.timeout = timeout
+        self.client_id = uuid.uuid4().hex
+        self.workflow, self.load_id, self.save_id = load_workflow(workflow_path)
+        self._slots = threading.BoundedSemaphore(max_queued)
+        self._lock = threading.Lock()
+        self._pending = {}  # prompt_id -> Future
+        self._finished = {}  # prompt_id -> erreur ou None, terminé avant l'enregistrement du Future
+        self._fetcher = ThreadPoolExecutor(max_workers=2)
+        self._ws = None
+        self._listener = None
+        self._listening = False
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        """Ouvre la connexion websocket persistante et démarre le thread d'écoute."""
+        self._ws = websocket.WebSocket()
+        self._ws.connect(f"ws://{self.server}/ws?clientId={self.client_id}", timeout=self.timeout)
+        self._ws.settimeout(None)  # le thread d'écoute attend sans limite entre deux prompts
+        self._listening = True
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        print(f"🔌 Connecté à ComfyUI ({self.server})")
+
+    def close(self):
+        """Ferme la connexion ; les prompts encore en attente échouent."""
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            # abort() débloque le thread d'écoute (recv), puis on libère la socket
+            ws.abort()
+            self._listener.join()
+            ws.shutdown()
+        self._fetcher.shutdown(wait=True)
+        self._fail_pending(ConnectionError("Connexion ComfyUI fermée"))
+
+    def _fail_pending(self, error):
+        """Fait échouer tous les Futures en attente (connexion fermée ou perdue)."""
+        with self._lock:
+            self._listening = False
+            pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_exception(error)
+
+    # --- HTTP ---
+
+    def _url(self, path, **params):
+        query = f"?{urllib.parse.urlencode(params)}" if params else ""
+        return f"http://{self.server}{path}{query}"
+
+    def _get_json(self, path, **params):
+        with urllib.request.urlopen(self._url(path, **params), timeout=self.timeout) as r:
+            return json.loads(r.read())
+
+    def _post_json(self, path, payload):
+        req = urllib.request.Request(self._url(path), data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as r:
+            return json.loads(r.read())
+
+    def _upload(self, img):
+        """Envoie une vignette dans le dossier input de ComfyUI et renvoie son nom."""
+        buf = io.BytesIO()
+        img.convert("RGB").save(buf, format="PNG", compress_level=1)
+        boundary = uuid.uuid4().hex
+        name = f"traductionbd_{uuid.uuid4().hex}.png"
+        body = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="image"; filename="{name}"\r\n'
+            f"Content-Type: image/png\r\n\r\n"
+        ).encode("utf-8") + buf.getvalue() + (
+            f"\r\n--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="overwrite"\r\n\r\ntrue\r\n'
+            f"--{boundary}--\r\n"
+        ).encode("utf-8")
+        req = urllib.request.Request(self._url("/upload/image"), data=body,
+                                     headers={"Content-Type": f"multipart/form-data; boundary={boundary}"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as r:
+            info = json.loads(r.read())
+        return f"{info['subfolder']}/{info['name']}" if info.get("subfolder") else info["name"]
+
+    # --- File d'attente ---
+
+    def submit(self, img):
+        """
+        Met en file d'attente l'effacement du texte d'une vignette.
+
+        Parameters:
+        - img : PIL.Image.Image (crop de la bulle)
+
+        Returns:
+        - concurrent.futures.Future : résolu avec l'image nettoyée (PIL.Image, même taille que img)
+        """
+        if self._ws is None:
+            raise RuntimeError("ComfyUIEraser non connecté : appeler connect() d'abord")
+        if not self._listening:
+            raise ConnectionError("Connexion ComfyUI perdue")
+
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Aucune place libre dans la file ComfyUI après {self.timeout}s")
+        try:
+            workflow = json.loads(json.dumps(self.workflow))  # copie profonde
+            workflow[self.load_id]["inputs"]["image"] = self._upload(img)
+            prompt_id = self._post_json("/prompt", {"prompt": workflow, "client_id": self.client_id})["prompt_id"]
+        except BaseException:
+            self._slots.release()
+            raise
+
+        fut = Future()
+        fut.add_done_callback(lambda _: self._slots.release())
+        fut.prompt_id = prompt_id
+        fut.size = img.size
+        with self._lock:
+            if prompt_id in self._finished:
+                self._dispatch(prompt_id, fut, self._finished.pop(prompt_id))
+            elif not self._listening:
+                fut.set_exception(ConnectionError("Connexion ComfyUI perdue"))
+            else:
+                self._pending[prompt_id] = fut
+        return fut
+
+    def erase(self, img):
+        """Version synchrone de submit()."""
+        return self.submit(img).result(timeout=self.timeout)
+
+    def _listen(self):
+        """
+        Lit les messages websocket et résout les Futures par prompt_id.
+        Si la connexion tombe, les Futures en attente échouent (ConnectionError) au lieu de bloquer.
+        """
+        try:
+            self._receive_loop()
+        finally:
+            self._fail_pending(ConnectionError("Connexion ComfyUI perdue"))
+
+    def _receive_loop(self):
+        while self._ws is not None:
+            try:
+                message = self._ws.recv()
+            except Exception:
+                break
+            if message == "":
+                break  # connexion fermée par le serveur
+            if not isinstance(message, str):
+                continue  # aperçus binaires
+            msg = json.loads(message)
+            data = msg.get("data", {})
+            prompt_id = data.get("prompt_id")
+
+            if msg["type"] == "executing" and data.get("node") is None and prompt_id:
+                error = None
+            elif msg["type"] == "execution_error" and prompt_id:
+                error = RuntimeError(f"Erreur ComfyUI sur le prompt {prompt_id} : {data.get('exception_message')}")
+            else:
+                continue
+
+            with self._lock:
+                fut = self._pending.pop(prompt_id, None)
+                if fut is None:
+                    self._finished[prompt_id] = error
+                    continue
+            self._dispatch(prompt_id, fut, error)
+
+    def _dispatch(self, prompt_id, fut, error):
+        if error is not None:
+            fut.set_exception(error)
+        else:
+            self._fetcher.submit(self._collect, prompt_id, fut)
+
+    def _collect(self, prompt_id, fut):
+        """Télécharge l'image produite par le nœud de sauvegarde."""
+        try:
+            outputs = self._get_json(f"/history/{prompt_id}")[prompt_id]["outputs"]
+            image_info = outputs[self.save_id]["images"][0]
+            with urllib.request.urlopen(self._url("/view", **image_info), timeout=self.timeout) as r:
+                result = Image.open(io.BytesIO(r.read())).convert("RGB")
+            # Flux Kontext redimensionne l'entrée : on revient à la taille de la vignette
+            if result.size != fut.size:
+                result = result.resize(fut.size, Image.Resampling.LANCZOS)
+            fut.set_result(result)
+        except Exception as e:
+            fut.set_exception(e)
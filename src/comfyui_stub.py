@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Faux serveur ComfyUI pour tester ComfyUIEraser sans GPU.
+
+Reproduit le sous-ensemble du protocole utilisé par comfyui.py :
+- POST /upload/image  (multipart, champ "image")
+- POST /prompt        -> {"prompt_id": ...}, exécution simulée en arrière-plan
+- GET  /history/<id>  -> sorties du nœud SaveImage
+- GET  /view          -> image produite
+- GET  /ws?clientId=  -> websocket : messages "status", "executing" (node=None quand c'est fini)
+
+L'"effacement" remplit simplement la vignette avec sa couleur médiane.
+
+Usage : python src/comfyui_stub.py --port 8188 --delay 0.5
+"""
+import argparse
+import base64
+import hashlib
+import io
+import json
+import struct
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import numpy as np
+from PIL import Image
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+class StubState:
+    def __init__(self, delay):
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.inputs = {}    # nom -> octets PNG
+        self.outputs = {}   # nom -> octets PNG
+        self.history = {}   # prompt_id -> {"outputs": ...}
+        self.clients = {}   # client_id -> socket
+
+    def send(self, client_id, message):
+        """Envoie un message texte websocket (trame non masquée côté serveur)."""
+        payload = json.dumps(message).encode("utf-8")
+        if len(payload) < 126:
+            header = struct.pack("!BB", 0x81, len(payload))
+        elif len(payload) < 1 << 16:
+            header = struct.pack("!BBH", 0x81, 126, len(payload))
+        else:
+            header = struct.pack("!BBQ", 0x81, 127, len(payload))
+        with self.lock:
+            sock = self.clients.get(client_id)
+            if sock is not None:
+                sock.sendall(header + payload)
+
+    def run_prompt(self, prompt_id, prompt, client_id):
+        time.sleep(self.delay)
+        load_id = next(k for k, n in prompt.items() if n["class_type"] == "LoadImage")
+        save_id = next(k for k, n in prompt.items() if n["class_type"] == "SaveImage")
+        self.send(client_id, {"type": "executing", "data": {"node": load_id, "prompt_id": prompt_id}})
+
+        name = prompt[load_id]["inputs"]["image"]
+        with self.lock:
+            data = self.inputs.get(name)
+        if data is None:
+            self.send(client_id, {"type": "execution_error",
+                                  "data": {"prompt_id": prompt_id, "exception_message": f"image inconnue : {name}"}})
+            return
+
+        img = np.asarray(Image.open(io.BytesIO(data)).convert("RGB"))
+        color = tuple(int(c) for c in np.median(img.reshape(-1, 3), axis=0))
+        out = Image.new("RGB", (img.shape[1], img.shape[0]), color)
+        buf = io.BytesIO()
+        out.save(buf, format="PNG")
+
+        filename = f"traductionbd_{prompt_id}.png"
+        with self.lock:
+            self.outputs[filename] = buf.getvalue()
+            self.history[prompt_id] = {"outputs": {save_id: {"images": [
+                {"filename": filename, "subfolder": "", "type": "output"}]}}}
+        self.send(client_id, {"type": "executing", "data": {"node": None, "prompt_id": prompt_id}})
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _json(self, obj, status=200):
+            body = json.dumps(obj).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path == "/ws":
+                return self._websocket(query.get("clientId", [""])[0])
+            if url.path.startswith("/history/"):
+                prompt_id = url.path.rsplit("/", 1)[1]
+                with state.lock:
+                    entry = state.history.get(prompt_id)
+                return self._json({prompt_id: entry} if entry else {})
+            if url.path == "/view":
+                with state.lock:
+                    data = state.outputs.get(query.get("filename", [""])[0])
+                if data is None:
+                    return self._json({"error": "not found"}, 404)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/png")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+            self._json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            if url.path == "/upload/image":
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                message = BytesParser(policy=HTTP).parsebytes(
+                    f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body)
+                part = next(p for p in message.iter_parts() if p.get_param("name", header="content-disposition") == "image")
+                filename = part.get_filename()
+                with state.lock:
+                    state.inputs[filename] = part.get_payload(decode=True)
+                return self._json({"name": filename, "subfolder": "", "type": "input"})
+            if url.path == "/prompt":
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                prompt_id = str(uuid.uuid4())
+                threading.Thread(target=state.run_prompt,
+                                 args=(prompt_id, payload["prompt"], payload.get("client_id")), daemon=True).start()
+                return self._json({"prompt_id": prompt_id, "number": 0, "node_errors": {}})
+            self._json({"error": "not found"}, 404)
+
+        def _websocket(self, client_id):
+            key = self.headers["Sec-WebSocket-Key"]
+            accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+            self.send_response(101)
+            self.send_header("Upgrade", "websocket")
+            self.send_header("Connection", "Upgrade")
+            self.send_header("Sec-WebSocket-Accept", accept)
+            self.end_headers()
+            self.wfile.flush()
+
+            with state.lock:
+                state.clients[client_id] = self.connection
+            state.send(client_id, {"type": "status", "data": {"status": {"exec_info": {"queue_remaining": 0}}, "sid": client_id}})
+            try:
+                # on ignore le contenu des trames client ; fin de connexion = fin de la boucle
+                while self.connection.recv(4096):
+                    pass
+            except OSError:
+                pass
+            finally:
+                with state.lock:
+                    state.clients.pop(client_id, None)
+            self.close_connection = True
+
+    return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Faux serveur ComfyUI (protocole /prompt + websocket)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8188)
+    parser.add_argument("--delay", type=float, default=0.5, help="durée simulée d'un prompt (s)")
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(StubState(args.delay)))
+    print(f"Faux ComfyUI sur http://{args.host}:{args.port}")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
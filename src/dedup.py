@@ -0,0 +1,103 @@
+# Détection des pages en double (hash perceptuel) pour éviter de retraiter crédits, pubs, pages de fin...
+import os
+import json
+import tempfile
+from PIL import Image
+
+def dhash(image_path, hash_size=8):
+    """
+    Hash perceptuel par différence (dHash) d'une image.
+
+    L'image est réduite en niveaux de gris à (hash_size + 1) x hash_size puis chaque bit
+    indique si un pixel est plus clair que son voisin de droite : le hash résiste au
+    réencodage JPEG/PNG/WebP et aux légers redimensionnements.
+
+    Returns:
+    - int : hash de hash_size * hash_size bits
+    """
+    with Image.open(image_path) as img:
+        img.draft("L", (hash_size * 8, hash_size * 8))  # décodage JPEG réduit, beaucoup plus rapide
+        small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+
+    value = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+def hamming(a, b):
+    """Nombre de bits différents entre deux hash."""
+    return bin(a ^ b).count("1")
+
+class PageIndex:
+    """
+    Index persistant (JSON) des pages déjà traitées, par hash perceptuel.
+
+    Chaque entrée : {"source": page d'origine, "output": page traduite, "kind": "translated" | "skip"}.
+    "skip" marque une page connue à ne pas publier (pub, recrutement, crédits).
+
+    Recherche des quasi-doublons en O(1) : le hash de 64 bits est découpé en max_distance + 1
+    bandes ; deux hash à distance <= max_distance partagent forcément au moins une bande
+    identique, donc seules les entrées des mêmes seaux sont comparées.
+    """
+
+    def __init__(self, path="outputs/page_index.json", max_distance=3, hash_bits=64):
+        self.path = path
+        self.max_distance = max_distance
+        self.hash_bits = hash_bits
+        self.n_bands = max_distance + 1
+        self.band_bits = hash_bits // self.n_bands
+        self.entries = {}  # hash (int) -> entrée
+        self.buckets = {}  # (bande, valeur) -> set de hash
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for key, entry in json.load(f).items():
+                    self._insert(int(key, 16), entry)
+
+    def _bands(self, h):
+        mask = (1 << self.band_bits) - 1
+        return [(i, (h >> (i * self.band_bits)) & mask) for i in range(self.n_bands)]
+
+    def _insert(self, h, entry):
+        self.entries[h] = entry
+        for band in self._bands(h):
+            self.buckets.setdefault(band, set()).add(h)
+
+    def lookup(self, h):
+        """
+        Cherche une page identique ou quasi identique.
+
+        Returns:
+        - dict ou None : entrée la plus proche (distance <= max_distance)
+        """
+        if h in self.entries:
+            return self.entries[h]
+        best, best_dist = None, self.max_distance + 1
+        for band in self._bands(h):
+            for other in self.buckets.get(band, ()):
+                dist = hamming(h, other)
+                if dist < best_dist:
+                    best, best_dist = other, dist
+        return self.entries[best] if best is not None else None
+
+    def add(self, h, source, output=None, kind="translated"):
+        """Enregistre une page traitée (ou à ignorer) et sauvegarde l'index."""
+        self._insert(h, {"source": source, "output": output, "kind": kind})
+        self.save()
+
+    def mark_skip(self, image_path):
+        """Marque une page (pub, crédits...) pour qu'elle et ses doublons soient ignorés."""
+        self.add(dhash(image_path), image_path, kind="skip")
+
+    def save(self):
+        """Écrit l'index de façon atomique."""
+        out_dir = os.path.dirname(self.path) or "."
+        os.makedirs(out_dir, exist_ok=True)
+        data = {f"{h:016x}": entry for h, entry in self.entries.items()}
+        fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
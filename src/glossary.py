@@ -0,0 +1,227 @@
+# Glossaire par série : noms propres récurrents et traductions figées
+import os
+import re
+import json
+import tempfile
+from collections import Counter
+from traduction import ollama_llm
+
+# Mots anglais courants à ne jamais proposer comme noms propres
+COMMON_WORDS = set("""
+A ABOUT AFTER AGAIN ALL ALREADY ALSO ALWAYS AM AN AND ANY ANYONE ANYTHING ARE AROUND AS ASK AT AWAY BACK BE
+BECAUSE BEEN BEFORE BEING BETTER BUT BY CAN CAN'T CANNOT COME COULD DID DIDN'T DO DOES DOESN'T DOING DON'T
+DOWN EVEN EVER EVERY EVERYONE EVERYTHING EYES FACE FEEL FIND FIRST FOR FROM GET GIVE GO GOING GOOD GOT
+GREAT HAD HAS HAVE HAVEN'T HE HE'S HEAR HER HERE HIM HIS HOW I I'LL I'M I'VE IF IN INTO IS ISN'T IT IT'S ITS
+JUST KILL KNOW LET LET'S LIKE LITTLE LONG LOOK MADE MAKE MAN MANY MASTER ME MORE MOST MUCH MUST MY NEED NEVER
+NEW NO NOT NOTHING NOW OF OFF OH OKAY ON ONE ONLY OR OTHER OUR OUT OVER PEOPLE PLACE RIGHT SAID SAME SAY
+SEE SEEM SHE SHOULD SO SOME SOMEONE SOMETHING STILL SUCH SWORD TAKE TELL THAN THAT THAT'S THE THEIR THEM
+THEN THERE THESE THEY THING THINK THIS THOSE THOUGH TIME TO TOO TRY TWO UP US VERY WANT WAS WASN'T WAY WE
+WELL WERE WHAT WHAT'S WHEN WHERE WHICH WHILE WHO WHY WILL WITH WON'T WORLD WOULD YEAH YES YET YOU YOU'RE
+YOUR
+ABLE ACROSS ADD AGE AGO AHEAD AIR ALIVE ALONE ALONG ANOTHER ANSWER ANYWAY ATTACK BAD BATTLE BEAT BECOME BEHIND
+BELIEVE BEST BETWEEN BIG BLOOD BODY BOTH BOY BREAK BRING BROTHER CALL CARE CASE CHANCE CHANGE CHILD CLOSE COURSE
+DAY DEAD DEATH DIE DIFFERENT DOOR DONE EACH END ENEMY ENOUGH ELSE FALL FAR FATHER FEAR FEW FIGHT FINALLY FINE
+FOLLOW FORCE FORGET FRIEND FULL GIRL GUESS HAND HAPPEN HARD HEAD HEART HELP HIGH HOLD HOME HONOR HOPE HOUSE HUH
+IDEA IMPORTANT INSTEAD KEEP KIND KNEW LAST LATER LEARN LEAST LEAVE LEFT LESS LIFE LIGHT LIVE LOSE LOT LOVE MAYBE
+MEAN MIND MINE MOMENT MOTHER MOVE NAME NEAR NEXT NIGHT ONCE OPEN ORDER OWN PART PASS PATH PLAN POWER PROBLEM
+PUT QUITE REAL REALLY REASON REMAIN REMEMBER REST RUN SEEN SEND SENSE SHALL SHOW SIDE SINCE SKILL SORRY SOUND SPEAK
+STAND START STAY STOP STRONG SURE TEACH THANK THANKS THING THOUGHT THROUGH TOGETHER TOLD TONIGHT TOOK TRUE TRUST
+TURN UNDER UNTIL USE WAIT WALK WATCH WHOLE WIN WITHOUT WOMAN WORD WORK WORRY WRONG YEAR YOUNG
+""".split())
+
+# Variantes des mots courants (THINGS, REMAINING, TEACHES...) : ramenées à leur radical
+COMMON_SUFFIXES = ("ING", "ED", "ES", "S", "LY", "ER")
+
+TOKEN_PATTERN = re.compile(r"[A-ZÀ-ÖØ-Ýa-zß-öø-ÿ][A-ZÀ-ÖØ-Ýa-zß-öø-ÿ'\-]{2,}")
+
+def is_common_word(token):
+    """Mot courant (ou variante d'un mot courant par un suffixe), à ne jamais proposer comme nom propre."""
+    if token in COMMON_WORDS:
+        return True
+    for suffix in COMMON_SUFFIXES:
+        stem = token[:-len(suffix)]
+        if token.endswith(suffix) and len(stem) >= 3 and (stem in COMMON_WORDS or stem + "E" in COMMON_WORDS):
+            return True
+    return False
+
+def extract_candidate_terms(texts, max_words=2):
+    """
+    Extrait les termes candidats (mots et groupes de mots hors vocabulaire courant) d'une liste de textes OCR.
+
+    Dans un texte en casse mixte, seuls les mots commençant par une majuscule peuvent être des noms propres ;
+    un texte tout en majuscules (cas habituel des webtoons) ne donne pas cette information.
+
+    Parameters:
+    - texts : liste de textes (bulles)
+    - max_words : longueur maximale d'un groupe de mots
+
+    Returns:
+    - Counter : terme -> nombre d'occurrences
+    """
+    counts = Counter()
+    for text in texts:
+        text = str(text)
+        mixed_case = text != text.upper()
+        tokens = TOKEN_PATTERN.findall(text)
+        run = []
+        for tok in tokens + [None]:
+            if tok is not None and not (mixed_case and not tok[0].isupper()) and not is_common_word(tok.upper()):
+                run.append(tok.upper())
+                continue
+            # fin d'une suite de mots rares : on compte chaque mot et chaque groupe contigu
+            for size in range(1, max_words + 1):
+                for k in range(len(run) - size + 1):
+                    counts[" ".join(run[k:k + size])] += 1
+            run = []
+    return counts
+
+class Glossary:
+    """
+    Glossaire persistant d'une série (JSON).
+
+    - counts : nombre de pages où chaque terme candidat apparaît (une fois par page)
+    - chapters : chapitres où le terme apparaît (au plus min_chapters, seul le seuil compte)
+    - pages : pages déjà observées (une page retraitée n'est pas recomptée)
+    - entries : termes figés -> traduction à utiliser
+    - ignored : termes jugés non pertinents par le LLM, ou restés sans réponse (pour ne pas redemander)
+    - attempts : nombre de fois où un terme a été soumis sans obtenir de traduction
+
+    Un terme est soumis au LLM quand il apparaît dans min_count pages (par défaut dans un même
+    chapitre ; min_chapters > 1 exige en plus plusieurs chapitres) : les mots d'une seule scène
+    et les erreurs d'OCR ne déclenchent pas d'appel. Un terme oublié par le LLM, ou d'un lot dont
+    la réponse est illisible, est redemandé au plus max_attempts fois puis ignoré : le nombre
+    d'appels reste borné.
+    Seules les entrées présentes dans le lot courant sont injectées dans le prompt,
+    dans la limite de max_entries : la taille du prompt reste bornée.
+    """
+
+    def __init__(self, path, min_count=3, min_chapters=1, max_entries=20, max_attempts=2):
+        self.path = path
+        self.min_count = min_count
+        self.min_chapters = min_chapters
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        self.counts = Counter()
+        self.chapters = {}
+        self.pages = set()
+        self.entries = {}
+        self.ignored = set()
+        self.attempts = Counter()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.counts = Counter(data.get("counts", {}))
+            self.chapters = data.get("chapters", {})
+            self.pages = set(data.get("pages", []))
+            self.entries = data.get("entries", {})
+            self.ignored = set(data.get("ignored", []))
+            self.attempts = Counter(data.get("attempts", {}))
+
+    def observe(self, texts, source=None):
+        """
+        Compte une fois chaque terme candidat des textes d'une page.
+
+        - source : chemin de la page ; une page déjà observée n'est pas recomptée et son dossier
+                   sert de chapitre. Sans source, les termes ne sont associés à aucun chapitre.
+        """
+        if source is not None:
+            if source in self.pages:
+                return
+            self.pages.add(source)
+        chapter = os.path.dirname(source) if source is not None else None
+
+        for term in extract_candidate_terms(texts):
+            self.counts[term] += 1
+            seen = self.chapters.setdefault(term, [])
+            if chapter is not None and chapter not in seen and len(seen) < self.min_chapters:
+                seen.append(chapter)
+        self.save()
+
+    def pending_terms(self):
+        """Termes assez fréquents (et répartis sur assez de chapitres), qui ne sont ni figés ni ignorés."""
+        return [t for t, n in self.counts.most_common()
+                if n >= self.min_count
+                and (self.min_chapters <= 1 or len(self.chapters.get(t, ())) >= self.min_chapters)
+                and t not in self.entries and t not in self.ignored]
+
+    def pin_new_terms(self, model="gemma3:12b", max_terms=30):
+        """
+        Demande au LLM, en un seul appel, la traduction à figer pour les nouveaux termes fréquents
+        (au plus max_terms par appel, les plus fréquents d'abord).
+
+        Returns:
+        - dict : nouvelles entrées ajoutées
+        """
+        pending = self.pending_terms()[:max_terms]
+        if not pending:
+            return {}
+
+        prompt = """For each term below, taken from an English webtoon, decide whether it is a proper noun (character, place, sect, clan, martial technique, title).
+        Instruction: ONLY output a JSON object mapping each term to the French form that must be used consistently in translations (keep names as-is when they should not be translated), or to null if the term is not a proper noun. """+json.dumps(pending, ensure_ascii=False)
+        system_prompt = "You build a translation glossary for a webtoon. ONLY output a JSON object, without explanations."
+
+        r = ollama_llm(prompt, system_prompt, model=model)
+        try:
+            answer = json.loads(r)
+        except json.JSONDecodeError:
+            print(f"⚠️ Réponse du glossaire illisible pour ce lot : {r}")
+            answer = None
+
+        added = {}
+        for term in pending:
+            translation = answer.get(term) if isinstance(answer, dict) else None
+            if isinstance(translation, str) and translation.strip():
+                self.entries[term] = translation.strip().upper()
+                added[term] = self.entries[term]
+                self.attempts.pop(term, None)
+            elif isinstance(answer, dict) and term in answer:
+                self.ignored.add(term)
+                self.attempts.pop(term, None)
+            else:
+                # terme oublié ou réponse illisible : redemandé au plus max_attempts fois
+                self.attempts[term] += 1
+                if self.attempts[term] >= self.max_attempts:
+                    self.ignored.add(term)
+                    del self.attempts[term]
+        if added:
+            print(f"📘 Glossaire : {added}")
+        self.save()
+        return added
+
+    def relevant_entries(self, texts):
+        """
+        Entrées du glossaire présentes dans les textes, les plus fréquentes d'abord.
+
+        Returns:
+        - dict : terme -> traduction (au plus max_entries éléments)
+        """
+        joined = " ".join(str(t) for t in texts).upper()
+        squashed = joined.replace(" ", "")  # l'OCR colle souvent les mots : "THISMURIMWASIN"
+        found = [t for t in self.entries
+                 if re.search(rf"\b{re.escape(t)}\b", joined)
+                 # sans espaces, seuls les termes de plusieurs mots sont assez spécifiques ("ASH" est dans "WASHERE")
+                 or (" " in t and t.replace(" ", "") in squashed)]
+        found.sort(key=lambda t: -self.counts.get(t, 0))
+        return {t: self.entries[t] for t in found[:self.max_entries]}
+
+    def prompt_section(self, texts):
+        """Bloc à ajouter au prompt de traduction (chaîne vide si aucune entrée pertinente)."""
+        entries = self.relevant_entries(texts)
+        if not entries:
+            return ""
+        return " Always use these fixed translations for names and terms: " + json.dumps(entries, ensure_ascii=False) + ". "
+
+    def save(self):
+        """Écrit le glossaire de façon atomique."""
+        out_dir = os.path.dirname(self.path) or "."
+        os.makedirs(out_dir, exist_ok=True)
+        data = {"counts": dict(self.counts), "chapters": self.chapters, "pages": sorted(self.pages),
+                "entries": self.entries, "ignored": sorted(self.ignored), "attempts": dict(self.attempts)}
+        fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+def load_glossary(series_name, folder="outputs/glossaries", **kwargs):
+    """Charge (ou crée) le glossaire d'une série."""
+    return Glossary(os.path.join(folder, f"{series_name}.json"), **kwargs)
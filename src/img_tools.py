@@ -1,17 +1,25 @@
 import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import os
-from typing import Union, Tuple
+import math
+import tempfile
+from functools import lru_cache
+from typing import Union, Tuple, NamedTuple
 
-def load_image_as_numpy(img_path, max_side=None):
+def load_image_as_numpy(img_path, max_side=None, cache=None):
     """
     Charge une image en numpy.ndarray (RGB), avec option de redimensionnement.
     Si max_side est None, l'image n'est pas redimensionnée.
+    Si cache (PageCache) est fourni et qu'il n'y a pas de redimensionnement, renvoie
+    une vue en lecture seule sur la page déjà décodée au lieu de la décoder à nouveau.
     
     Returns:
         - numpy.ndarray : image RGB
         - float : facteur de réduction (1.0 si pas de resize)
     """
+    if max_side is None and cache is not None:
+        return cache.get(img_path), 1.0
+
     img = Image.open(img_path).convert("RGB")
     w, h = img.size
 
@@ -77,6 +85,24 @@ def average_grayscale(img_path):
     # Calculer la moyenne
     return img_np.mean()
 
+def region_average_grayscale(img_np, box):
+    """
+    Moyenne de gris d'une région d'une image déjà chargée, sans copie ni relecture disque.
+
+    Parameters:
+    - img_np : image RGB (numpy.ndarray ou vue memmap)
+    - box : (x_min, y_min, x_max, y_max)
+
+    Returns:
+    - float : valeur moyenne de gris (0 = noir, 255 = blanc)
+    """
+    x_min, y_min, x_max, y_max = (int(v) for v in box)
+    region = img_np[y_min:y_max, x_min:x_max]
+    if region.size == 0:
+        return 0.0
+    # mêmes coefficients que la conversion "L" de Pillow
+    return float((region.reshape(-1, 3).mean(axis=0) * (0.299, 0.587, 0.114)).sum())
+
 def create_and_save_solid_image(width, height, color=(255, 255, 255), save_path="image.png"):
     """
     Crée une image unie et la sauvegarde directement.
@@ -108,6 +134,334 @@ def get_image_size(image_path):
     img = Image.open(image_path)
     return img.size  # img.size renvoie (width, height)
 
+@lru_cache(maxsize=256)
+def load_font(font_path, size):
+    """Charge (une seule fois) une police TrueType à une taille donnée."""
+    return ImageFont.truetype(font_path, size)
+
+@lru_cache(maxsize=65536)
+def text_advance(font_path, size, text):
+    """Largeur d'avance d'un mot (ou caractère) pour une police et une taille, mise en cache."""
+    return load_font(font_path, size).getlength(text)
+
+@lru_cache(maxsize=65536)
+def text_ink(font_path, size, text):
+    """
+    Étendue horizontale de l'encre d'un texte (left, right), depuis l'origine du tracé, mise en cache.
+    Avec Komika l'encre déborde de la largeur d'avance : c'est elle qu'il faut faire tenir dans la bulle
+    (même mesure que draw.textbbox).
+    """
+    left, _, right, _ = load_font(font_path, size).getbbox(text)
+    return left, right
+
+def ink_width(font_path, size, text):
+    """Largeur de l'encre d'un texte (0 pour un texte vide)."""
+    left, right = text_ink(font_path, size, text)
+    return max(0, right - left)
+
+@lru_cache(maxsize=256)
+def font_line_metrics(font_path, size):
+    """Hauteur de base d'une ligne (ascent + descent) pour une police et une taille."""
+    ascent, descent = load_font(font_path, size).getmetrics()
+    return ascent + descent
+
+class TextLayout(NamedTuple):
+    """Mise en page prête à dessiner : lignes positionnées (texte, x, y) et métriques."""
+    font_size: int
+    lines: Tuple[Tuple[str, int, int], ...]
+    base_line_height: int
+    line_spacing: int
+    total_line_height: int
+    mode: str = "wrap"
+
+# Taille de référence des estimations : largeurs et hauteurs d'une police sont ~ proportionnelles à la taille
+REF_FONT_SIZE = 100
+
+def wrap_text_for_font(text, font_path, size, max_width):
+    """
+    Découpe le texte en lignes dont l'encre tient dans max_width, à partir des mesures de mots
+    en cache (avance et étendue d'encre de chaque mot, une seule fois par taille, plus l'avance d'un espace).
+    Les mots trop longs sont cassés caractère par caractère.
+
+    Returns:
+    - list[(str, float)] : lignes et largeur de leur encre
+    """
+    space_w = text_advance(font_path, size, " ")
+    lines = []
+    for para in text.split("\n"):
+        words = para.split()
+        if not words:
+            lines.append(("", 0))  # ligne vide
+            continue
+
+        # current_adv : position du stylo après le dernier mot ; current_left : début de l'encre de la ligne
+        current, current_w, current_adv, current_left = [], 0, 0, 0
+        for word in words:
+            word_left, word_right = text_ink(font_path, size, word)
+            start = current_adv + space_w if current else 0
+            left = current_left if current else word_left
+            candidate_w = start + word_right - left
+
+            if candidate_w <= max_width:
+                current.append(word)
+                current_w, current_adv, current_left = candidate_w, start + text_advance(font_path, size, word), left
+                continue
+
+            if current:
+                lines.append((" ".join(current), current_w))
+
+            if word_right - word_left <= max_width:
+                current = [word]
+                current_w, current_adv, current_left = word_right - word_left, text_advance(font_path, size, word), word_left
+            else:
+                # mot trop large à lui seul -> découpe par caractères
+                chunk, chunk_w, chunk_adv, chunk_left = "", 0, 0, 0
+                for ch in word:
+                    ch_left, ch_right = text_ink(font_path, size, ch)
+                    left = chunk_left if chunk else ch_left
+                    if chunk_adv + ch_right - left <= max_width or not chunk:
+                        chunk_w, chunk_left = chunk_adv + ch_right - left, left
+                        chunk += ch
+                        chunk_adv += text_advance(font_path, size, ch)
+                    else:
+                        lines.append((chunk, chunk_w))
+                        chunk, chunk_w, chunk_adv, chunk_left = ch, ch_right - ch_left, text_advance(font_path, size, ch), ch_left
+                current = [chunk]
+                current_w, current_adv, current_left = chunk_w, chunk_adv, chunk_left
+
+        if current:
+            lines.append((" ".join(current), current_w))
+
+    return lines
+
+def lines_for_mode(text, font_path, size, max_width, mode="wrap"):
+    """
+    Lignes (texte, largeur) d'un texte selon le mode de mise en page :
+    - "wrap" : retour à la ligne classique (wrap_text_for_font)
+    - "single" : une ligne par paragraphe, jamais coupée (SFX)
+    - "vertical" : un caractère par ligne, empilés, une ligne vide entre deux mots (boîtes étroites et hautes)
+    """
+    if mode == "single":
+        return [(p, ink_width(font_path, size, p)) for p in text.split("\n")]
+    if mode == "vertical":
+        return [(ch, ink_width(font_path, size, ch)) if not ch.isspace() else ("", 0)
+                for ch in " ".join(text.split())] or [("", 0)]  # texte vide : une ligne vide, comme les autres modes
+    return wrap_text_for_font(text, font_path, size, max_width)
+
+def estimate_font_size(text, font_path, max_width, max_height, line_spacing_percent=20.0, mode="wrap"):
+    """
+    Taille de police estimée sans mise en page, à partir des largeurs mesurées une fois à REF_FONT_SIZE.
+
+    - "single" / "vertical" : le nombre de lignes est connu, la taille est donnée par la ligne
+      la plus large et la hauteur du bloc (estimation quasi exacte)
+    - "wrap" : la surface occupée par le texte (largeur totale x hauteur de ligne) ne peut pas
+      dépasser celle de la boîte ; bornée aussi par le nombre de paragraphes et le caractère le plus large
+
+    Returns:
+    - float : taille estimée (à arrondir puis vérifier)
+    """
+    ref = REF_FONT_SIZE
+    base_h = font_line_metrics(font_path, ref) / ref
+    line_h = base_h * (1 + line_spacing_percent / 100.0)
+    spacing_h = line_h - base_h
+
+    def fit_block(n_lines, widest):
+        # n lignes de hauteur base_h séparées par (n-1) interlignes
+        by_height = max_height / max(base_h, n_lines * line_h - spacing_h)
+        return min(by_height, max_width / widest) if widest > 0 else by_height
+
+    if mode in ("single", "vertical"):
+        lines = lines_for_mode(text, font_path, ref, max_width * ref, mode)
+        return fit_block(len(lines), max(w for _, w in lines) / ref)
+
+    chars = set(text) - set(" \n\t")
+    if not chars:
+        return fit_block(1, 0)
+    widest_char = max(ink_width(font_path, ref, ch) for ch in chars) / ref
+    paragraphs = text.split("\n")
+    total_w = sum(text_advance(font_path, ref, p) for p in paragraphs) / ref
+    by_area = math.sqrt(max_width * max_height / (total_w * line_h)) if total_w > 0 and line_h > 0 else float("inf")
+    return min(by_area, fit_block(len(paragraphs), widest_char))
+
+def choose_layout_mode(text, font_path, box_width, box_height, line_spacing_percent=20.0, tall_ratio=2.0):
+    """
+    Mode de mise en page automatique :
+    - un seul mot (SFX, onomatopée) dans une boîte qui n'est pas étroite et haute : "single"
+    - boîte étroite et haute (hauteur >= tall_ratio x largeur) où le mot le plus long ne tiendrait pas
+      en largeur à la taille estimée : "vertical" si l'empilement garde au moins 70 % de la taille estimée,
+      plutôt que de couper les mots au hasard
+    - sinon : "wrap"
+    """
+    words = text.split()
+    if not words or "\n" in text.strip():
+        return "wrap"
+    tall = box_height >= tall_ratio * box_width
+    if len(words) == 1 and not tall:
+        return "single"
+    if tall:
+        size = estimate_font_size(text, font_path, box_width, box_height, line_spacing_percent, "wrap")
+        longest = max(ink_width(font_path, REF_FONT_SIZE, w) for w in words) / REF_FONT_SIZE
+        if longest * size > box_width and \
+                estimate_font_size(text, font_path, box_width, box_height, line_spacing_percent, "vertical") >= 0.7 * size:
+            return "vertical"
+    return "wrap"
+
+@lru_cache(maxsize=1024)
+def layout_text(
+    text: str,
+    font_path: str,
+    box_width: int,
+    box_height: int,
+    font_size: int,
+    margin: int = 10,
+    min_font_size: int = 1,
+    line_spacing_percent: float = 20.0,
+    mode: str = "auto"
+) -> TextLayout:
+    """
+    Calcule la plus grande taille de police (<= font_size) pour laquelle le texte tient
+    dans la boîte, et renvoie les lignes déjà centrées.
+
+    La taille de départ est estimée (estimate_font_size) au lieu de descendre pas à pas
+    depuis font_size ; en cas de débordement la taille est réduite en proportion (sinon
+    sondée un peu au-dessus), puis affinée par dichotomie : quelques mises en page suffisent par bulle.
+    Les largeurs vérifiées sont celles de l'encre (text_ink), comme draw.textbbox ; la taille retenue
+    est revérifiée ligne entière par ligne entière.
+
+    Le résultat est mis en cache par (texte, taille de boîte, police, ...) : les SFX
+    répétés d'une page à l'autre ne sont mis en page qu'une fois.
+
+    - mode : "auto" (choose_layout_mode, avec repli sur "wrap" si "single" ne tient à aucune taille),
+             "wrap", "single" ou "vertical"
+    """
+    max_width = max(1, box_width - 2 * margin)
+    max_height = max(1, box_height - 2 * margin)
+    auto = mode == "auto"
+    if auto:
+        mode = choose_layout_mode(text, font_path, max_width, max_height, line_spacing_percent)
+
+    def metrics(size):
+        base_height = font_line_metrics(font_path, size)
+        spacing = int(base_height * (line_spacing_percent / 100.0))
+        return base_height, spacing, base_height + spacing
+
+    def measure(size):
+        """Lignes à cette taille et facteur de réduction nécessaire (>= 1 : le texte tient)."""
+        try:
+            lines = lines_for_mode(text, font_path, size, max_width, mode)
+        except OSError:
+            # police non chargée pour cette taille (rare)
+            return None, 0
+        base_height, spacing, line_height = metrics(size)
+        # Hauteur totale : on compte (n-1) interlignes pour n lignes
+        total_height = len(lines) * base_height + (len(lines) - 1) * spacing
+        max_line_w = max(w for _, w in lines)
+        ratio_h = max_height / total_height if total_height > 0 else float("inf")
+        ratio_w = max_width / max_line_w if max_line_w > 0 else float("inf")
+        if mode == "wrap" and ratio_h < 1:
+            # en retour à la ligne, réduire la taille réduit aussi le nombre de lignes : hauteur ~ taille²
+            ratio_h = math.sqrt(ratio_h)
+        return lines, min(ratio_h, ratio_w)
+
+    size = max(min_font_size, min(font_size, int(estimate_font_size(text, font_path, max_width, max_height, line_spacing_percent, mode))))
+    chosen, too_big = None, None
+    while size >= min_font_size:
+        lines, ratio = measure(size)
+        if lines is None:
+            size -= 1
+            continue
+        if ratio >= 1:
+            chosen = (size, lines)
+            break
+        too_big = size
+        size = min(size - 1, int(size * ratio))
+
+    # L'estimation peut être un peu basse (métriques arrondies) : si elle tient du premier coup,
+    # on sonde au-dessus par pas croissants jusqu'à trouver une taille qui déborde
+    step = max(1, size // 20)
+    while chosen is not None and too_big is None and chosen[0] < font_size:
+        probe = min(font_size, chosen[0] + step)
+        lines, ratio = measure(probe)
+        if lines is not None and ratio >= 1:
+            chosen = (probe, lines)
+            step *= 2
+        else:
+            too_big = probe
+
+    # Dichotomie entre la dernière taille qui tient et la première qui déborde
+    if chosen is not None and too_big is not None:
+        low, high = chosen[0], too_big
+        while high - low > 1:
+            mid = (low + high) // 2
+            lines, ratio = measure(mid)
+            if ratio >= 1:
+                low, chosen = mid, (mid, lines)
+            else:
+                high = mid
+
+    # Vérification finale sur l'encre de chaque ligne entière (comme draw.textbbox) : les largeurs
+    # composées mot à mot ignorent le crénage autour des espaces, on redescend si la ligne déborde
+    while chosen is not None and max(ink_width(font_path, chosen[0], ln) for ln, _ in chosen[1]) > max_width:
+        size, chosen = chosen[0] - 1, None
+        while size >= min_font_size and chosen is None:
+            lines, ratio = measure(size)
+            if lines is not None and ratio >= 1:
+                chosen = (size, lines)
+            size -= 1
+
+    # SFX qui ne tient sur une ligne à aucune taille : en automatique, on revient au retour à la ligne
+    if chosen is None and auto and mode == "single":
+        return layout_text(text, font_path, box_width, box_height, font_size, margin, min_font_size, line_spacing_percent, "wrap")
+
+    # Si aucune taille convenable trouvée -> utiliser min_font_size
+    if chosen is None:
+        size = max(min_font_size, 8)
+        chosen = (size, lines_for_mode(text, font_path, size, max_width, mode))
+
+    size, lines = chosen
+    base_height, spacing, line_height = metrics(size)
+    total_text_height = len(lines) * base_height + (len(lines) - 1) * spacing
+
+    # Centrage vertical de l'ensemble, horizontal ligne par ligne (sur l'encre, pas sur l'avance)
+    y = margin + (max_height - total_text_height) // 2
+    positioned = []
+    for ln, _ in lines:
+        left, right = text_ink(font_path, size, ln)
+        x = margin + (max_width - (right - left)) // 2 - left
+        positioned.append((ln, int(x), int(y)))
+        y += base_height + spacing
+
+    return TextLayout(size, tuple(positioned), base_height, spacing, line_height, mode)
+
+def draw_text_in_box(
+    img: Image.Image,
+    box: Tuple[int, int, int, int],
+    text: str,
+    font_path: str,
+    font_size: int,
+    margin: int = 10,
+    min_font_size: int = 1,
+    fill_color: Union[Tuple[int,int,int], str] = (0,0,0),
+    line_spacing_percent: float = 20.0,
+    mode: str = "auto"
+) -> TextLayout:
+    """
+    Écrit du texte centré dans une zone (x_min, y_min, x_max, y_max) d'une image déjà ouverte,
+    directement en mémoire (pas de fichier intermédiaire).
+
+    Returns:
+    - TextLayout : mise en page utilisée (coordonnées relatives à la zone)
+    """
+    x0, y0, x1, y1 = (int(v) for v in box)
+    layout = layout_text(text, font_path, x1 - x0, y1 - y0, font_size, margin, min_font_size, line_spacing_percent, mode)
+    font = load_font(font_path, layout.font_size)
+
+    # Dessiner les lignes déjà positionnées
+    draw = ImageDraw.Draw(img)
+    for ln, x, y in layout.lines:
+        draw.text((x0 + x, y0 + y), ln, font=font, fill=fill_color)
+    return layout
+
 def draw_centered_text(
     image_path: str, 
     text: str, 
@@ -117,7 +471,8 @@ def draw_centered_text(
     margin: int = 10, 
     min_font_size: int = 1, 
     fill_color: Union[Tuple[int,int,int], str] = (0,0,0),
-    line_spacing_percent: float = 20.0
+    line_spacing_percent: float = 20.0,
+    mode: str = "auto"
 ):
     """
     Écrit du texte centré sur une image en s'assurant que le texte tient parfaitement.
@@ -132,6 +487,7 @@ def draw_centered_text(
     - fill_color: couleur du texte (tuple RGB ou nom)
     - line_spacing_percent: espacement entre les lignes en % de la hauteur de police
                            (100% = hauteur de police, 50% = moitié, 0% = lignes qui se touchent)
+    - mode: "auto", "wrap", "single" (SFX sur une ligne) ou "vertical" (caractères empilés)
     """
     if not os.path.isfile(image_path):
         raise FileNotFoundError(f"Image introuvable: {image_path}")
@@ -139,155 +495,7 @@ def draw_centered_text(
         raise FileNotFoundError(f"Police introuvable: {font_path}")
 
     img = Image.open(image_path).convert("RGB")
-    draw = ImageDraw.Draw(img)
-
-    # zone disponible
-    max_width = max(1, img.width - 2 * margin)
-    max_height = max(1, img.height - 2 * margin)
-
-    def split_text_lines_for_font(font):
-        """Retourne la liste de lignes adaptées à max_width, en cassant les mots si besoin."""
-        lines = []
-        for para in text.split("\n"):
-            words = para.split()
-            if not words:
-                lines.append("")  # ligne vide
-                continue
-            
-            current = ""
-            for word in words:
-                candidate = current + (" " if current else "") + word
-                bbox = draw.textbbox((0,0), candidate, font=font)
-                w = bbox[2] - bbox[0]
-                
-                if w <= max_width:
-                    current = candidate
-                else:
-                    # si current non vide -> pousser current puis start with word (or break word)
-                    if current:
-                        lines.append(current)
-                    
-                    # now handle word which might be too long by itself
-                    # if word alone is too wide, break by characters
-                    single_bbox = draw.textbbox((0,0), word, font=font)
-                    single_w = single_bbox[2] - single_bbox[0]
-                    
-                    if single_w <= max_width:
-                        current = word
-                    else:
-                        # break word into chunks of characters
-                        chunk = ""
-                        for ch in word:
-                            test_chunk = chunk + ch
-                            bbox_ch = draw.textbbox((0,0), test_chunk, font=font)
-                            if bbox_ch[2] - bbox_ch[0] <= max_width:
-                                chunk = test_chunk
-                            else:
-                                if chunk:
-                                    lines.append(chunk)
-                                chunk = ch
-                        current = chunk
-            
-            if current:
-                lines.append(current)
-        
-        return lines
-
-    def calculate_line_metrics(font):
-        """Calcule les métriques de ligne avec l'interligne personnalisé."""
-        try:
-            ascent, descent = font.getmetrics()
-            base_line_height = ascent + descent
-        except Exception:
-            # fallback : bbox of "Ay"
-            bbox_ay = draw.textbbox((0,0), "Ay", font=font)
-            base_line_height = bbox_ay[3] - bbox_ay[1]
-        
-        # Calcul de l'interligne en fonction du pourcentage
-        line_spacing = int(base_line_height * (line_spacing_percent / 100.0))
-        total_line_height = base_line_height + line_spacing
-        
-        return base_line_height, line_spacing, total_line_height
-
-    # Essayer les tailles à partir de font_size (descendre si nécessaire)
-    chosen_font = None
-    chosen_lines = None
-    chosen_line_height = None
-    chosen_base_height = None
-    chosen_spacing = None
-
-    size = font_size
-    while size >= min_font_size:
-        try:
-            font = ImageFont.truetype(font_path, size)
-        except Exception as e:
-            # police non chargée pour cette taille (rare) -> décrémente
-            size -= 1
-            continue
-
-        lines = split_text_lines_for_font(font)
-        if not lines:
-            # rien à écrire -> ok
-            chosen_font = font
-            chosen_lines = [""]
-            chosen_base_height, chosen_spacing, chosen_line_height = calculate_line_metrics(font)
-            break
-
-        # Calcul des métriques avec interligne personnalisé
-        base_height, spacing, line_height = calculate_line_metrics(font)
-        
-        # Hauteur totale : on compte (n-1) interlignes pour n lignes
-        if len(lines) > 1:
-            total_height = len(lines) * base_height + (len(lines) - 1) * spacing
-        else:
-            total_height = base_height
-
-        # largeur maximale réelle
-        max_line_w = 0
-        for ln in lines:
-            bbox_ln = draw.textbbox((0,0), ln, font=font)
-            w_ln = bbox_ln[2] - bbox_ln[0]
-            if w_ln > max_line_w:
-                max_line_w = w_ln
-
-        # vérifier si tout rentre
-        if total_height <= max_height and max_line_w <= max_width:
-            chosen_font = font
-            chosen_lines = lines
-            chosen_line_height = line_height
-            chosen_base_height = base_height
-            chosen_spacing = spacing
-            break
-
-        size -= 1
-
-    # Si aucune taille convenable trouvée -> utiliser min_font_size
-    if chosen_font is None:
-        chosen_font = ImageFont.truetype(font_path, max(min_font_size, 8))
-        chosen_lines = split_text_lines_for_font(chosen_font)
-        chosen_base_height, chosen_spacing, chosen_line_height = calculate_line_metrics(chosen_font)
-
-    # Calculer origine (avec marges) pour centrer verticalement
-    if len(chosen_lines) > 1:
-        total_text_height = len(chosen_lines) * chosen_base_height + (len(chosen_lines) - 1) * chosen_spacing
-    else:
-        total_text_height = chosen_base_height if chosen_lines else 0
-    
-    y_start = margin + (max_height - total_text_height) // 2
-
-    # Dessiner ligne par ligne, centrée horizontalement dans la zone
-    y = int(y_start)
-    for i, ln in enumerate(chosen_lines):
-        bbox_ln = draw.textbbox((0,0), ln, font=chosen_font)
-        w_ln = bbox_ln[2] - bbox_ln[0]
-        x = margin + (max_width - w_ln) // 2
-        
-        draw.text((int(x), int(y)), ln, font=chosen_font, fill=fill_color)
-        
-        # Pour la ligne suivante, ajouter hauteur de base + espacement
-        # (sauf pour la dernière ligne)
-        if i < len(chosen_lines) - 1:
-            y += chosen_base_height + chosen_spacing
+    layout = draw_text_in_box(img, (0, 0, img.width, img.height), text, font_path, font_size, margin, min_font_size, fill_color, line_spacing_percent, mode)
 
     # Sauvegarder
     out_dir = os.path.dirname(output_path)
@@ -298,15 +506,15 @@ def draw_centered_text(
 
     # Retour utile : la taille de police choisie et infos
     print(f"Image sauvegardée : {output_path}")
-    print(f"Font size used: {chosen_font.size}")
-    print(f"Line spacing: {line_spacing_percent}% ({chosen_spacing}px)")
+    print(f"Font size used: {layout.font_size} ({layout.mode})")
+    print(f"Line spacing: {line_spacing_percent}% ({layout.line_spacing}px)")
     
     return {
-        "font_size": chosen_font.size, 
-        "lines": chosen_lines, 
-        "base_line_height": chosen_base_height,
-        "line_spacing": chosen_spacing,
-        "total_line_height": chosen_line_height,
+        "font_size": layout.font_size, 
+        "lines": [ln for ln, _, _ in layout.lines], 
+        "base_line_height": layout.base_line_height,
+        "line_spacing": layout.line_spacing,
+        "total_line_height": layout.total_line_height,
         "line_spacing_percent": line_spacing_percent
     }
 
@@ -336,3 +544,64 @@ def paste_image(img1_path, img2_path, x, y, save_path=None):
         print(f"Image saved to {save_path}")
     else:
         return img1
+
+# Codecs disponibles pour les pages traduites : extension, format Pillow
+PAGE_CODECS = {
+    "png": (".png", "PNG"),
+    "webp": (".webp", "WEBP"),
+}
+
+def page_output_path(base_path, codec="png"):
+    """
+    Remplace l'extension de base_path par celle du codec choisi.
+
+    Parameters:
+    - base_path : chemin de sortie (extension quelconque)
+    - codec : clé de PAGE_CODECS ("png" ou "webp")
+
+    Returns:
+    - str : chemin avec la bonne extension
+    """
+    if codec not in PAGE_CODECS:
+        raise ValueError(f"Codec inconnu : {codec} (attendu : {', '.join(PAGE_CODECS)})")
+    return os.path.splitext(base_path)[0] + PAGE_CODECS[codec][0]
+
+def save_image_atomic(img, save_path, codec="png", compress_level=1):
+    """
+    Encode une image une seule fois puis la publie de façon atomique
+    (fichier temporaire dans le même dossier + os.replace), pour qu'aucune
+    page à moitié écrite n'apparaisse dans le dossier de sortie.
+
+    Parameters:
+    - img : PIL.Image.Image à sauvegarder
+    - save_path : chemin final
+    - codec : "png" (zlib, compress_level 0-9) ou "webp" (sans perte, method 0-6)
+    - compress_level : niveau de compression, bas = rapide
+
+    Returns:
+    - str : chemin final
+    """
+    if codec not in PAGE_CODECS:
+        raise ValueError(f"Codec inconnu : {codec} (attendu : {', '.join(PAGE_CODECS)})")
+    _, pil_format = PAGE_CODECS[codec]
+
+    if codec == "png":
+        save_kwargs = {"compress_level": compress_level}
+    else:
+        save_kwargs = {"lossless": True, "method": min(compress_level, 6)}
+
+    out_dir = os.path.dirname(save_path) or "."
+    os.makedirs(out_dir, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format=pil_format, **save_kwargs)
+        os.replace(tmp_path, save_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    print(f"Page sauvegardée : {save_path}")
+    return save_path
@@ -1,146 +1,141 @@
 # Main pipeline
-from ocr import extract_text_from_image,ocr_results_to_dataframe, filter_by_score, cluster_polygons, add_cluster_column, bounding_boxes_by_cluster_with_text
-from img_tools import get_image_size, save_crops_from_coords, load_image_as_numpy,create_and_save_solid_image,average_grayscale, draw_centered_text, paste_image
-from traduction import ollama_llm
-from tools import clean_folder, launch_exe, natural_sort_key
+from pipeline import Pipeline, PipelineConfig
+from img_tools import page_output_path
+from page_cache import PageCache
+from glossary import load_glossary
+from comfyui import ComfyUIEraser
+from dedup import PageIndex, dhash, hamming
+from tools import launch_exe, natural_sort_key, copy_file_atomic, MemoryBudget
 import os
-import json
-from PIL import Image
-from pathlib import Path
-from paddleocr import PaddleOCR
-import pandas as pd
-import shutil
-
-def main(image, ocr):
-
-    max_attempts = 3
-    df = None
-    for attempt in range(1, max_attempts + 1):
-        print(f"🔄 OCR attempt {attempt} for {image}")
-
-        # Step 1: Extract text from image
-        img_np, factor = load_image_as_numpy(image, None)
-        result = extract_text_from_image(img_np, ocr)
-
-        # Step 2: Convert OCR results to DataFrame
-        df = ocr_results_to_dataframe(result)
-
-        # Step 3: Filter DataFrame by score
-        filtered_df = filter_by_score(df, min_score=0.7)    
-    
-        if not filtered_df.empty:
-            print(f"✅ OCR successful on attempt {attempt}")
-            break  # On sort dès qu'on a des résultats
+import gc
+
+def reuse_known_page(image, output_path, page_index):
+    """
+    Step 0 : Page déjà vue (doublon ou quasi-doublon) ? On réutilise la traduction ou on l'ignore.
+
+    Returns:
+    - (bool, int) : True si la page n'est pas à traiter, hash perceptuel de la page
+    """
+    page_hash = dhash(image)
+    known = page_index.lookup(page_hash)
+    if known is not None and known["kind"] == "skip":
+        print(f"⏭️ Page ignorée (doublon de {known['source']}) : {image}")
+        return True, page_hash
+    if known is not None and known["source"] != image and known["output"] and os.path.exists(known["output"]) \
+            and os.path.splitext(known["output"])[1] == os.path.splitext(output_path)[1]:
+        if os.path.abspath(known["output"]) != os.path.abspath(output_path):
+            copy_file_atomic(known["output"], output_path)
+        print(f"♻️ Traduction réutilisée ({known['source']}) : {output_path}")
+        return True, page_hash
+    return False, page_hash
+
+def translate_pages(jobs, pipeline, glossary=None, page_index=None):
+    """
+    Traduit une suite de pages du disque [(image, output_path)] avec Pipeline.process_many :
+    avec un eraser ComfyUI, les vignettes d'une page sont effacées pendant l'OCR et la traduction de la suivante.
+    Chaque page est écrite dans output_path (extension donnée par le codec du pipeline) dès qu'elle est prête.
+
+    Une page n'est ajoutée à l'index qu'une fois écrite, alors que la suivante est déjà en cours :
+    le doublon d'une page encore dans le pipeline est copié depuis celle-ci dès qu'elle est écrite.
+
+    Yields:
+    - PageResult des pages traitées (les doublons réutilisés ou ignorés n'en produisent pas)
+    """
+    todo = {}
+    in_flight = {}  # hash -> page envoyée au pipeline mais pas encore écrite ni indexée
+    twins = {}  # page en cours -> sorties de ses doublons, copiées une fois la page écrite
+
+    def pages_to_process():
+        for image, output_path in jobs:
+            output_path = page_output_path(output_path, pipeline.config.codec)
+            page_hash = None
+            if page_index is not None:
+                done, page_hash = reuse_known_page(image, output_path, page_index)
+                if done:
+                    continue
+                twin = next((src for h, src in in_flight.items() if hamming(h, page_hash) <= page_index.max_distance), None)
+                if twin is not None:
+                    print(f"♻️ Doublon de {twin} (en cours), copié dès qu'elle sera écrite : {output_path}")
+                    twins.setdefault(twin, []).append(output_path)
+                    continue
+                in_flight[page_hash] = image
+            todo[image] = (output_path, page_hash)
+            yield image
+
+    # Steps 1 à 11 : OCR, regroupement, effacement, traduction et rendu, en mémoire
+    for result in pipeline.process_many(pages_to_process(), glossary=glossary):
+        output_path, page_hash = todo.pop(result.source)
+        if result.boxes.empty:
+            # Après 3 tentatives sans texte, copier l'image telle quelle
+            print(f"📄 Image copiée sans OCR dans {output_path}")
         else:
-            print(f"⚠️ No text detected on attempt {attempt}")
-            if attempt == max_attempts:
-                # Après 3 tentatives, copier l'image telle quelle
-                img_text_drawn_outputs = os.path.join(
-                    "outputs", "translated_chapter",
-                    os.path.splitext(os.path.relpath(file_path, "inputs/scans"))[0] + ".png"
-                )
-                os.makedirs(os.path.dirname(img_text_drawn_outputs), exist_ok=True)
-                img = Image.open(image)
-                img.save(img_text_drawn_outputs, format="PNG")
-                print(f"📄 Image copiée sans OCR dans {img_text_drawn_outputs}")
-                return
-
-    # Step 4 : Cluster the polygons
-    clusters = cluster_polygons(filtered_df, "x1","y1","x2","y2","x3","y3","x4","y4", margin_factor=0.2)
-
-    # Step 5 : Add cluster information to the DataFrame
-    clustered_df = add_cluster_column(filtered_df, clusters)
-    print(clustered_df)
-
-    # Step 6 : Get bounding boxes for each cluster
-    df_boxes = bounding_boxes_by_cluster_with_text(clustered_df)
-
-    # Step 7 : Save crops from bounding boxes
-    ocr_outputs_path = "outputs/ocr_outputs"
-    save_crops_from_coords(img_np, df_boxes[["x_min", "y_min", "x_max", "y_max"]].values, ocr_outputs_path,1)
-
-    # Step 8 : Remove text from img
-    text_remove_path = "outputs/text_remove_outputs"
-    for filename in os.listdir(ocr_outputs_path):
-        img_path = os.path.join(ocr_outputs_path, filename)
-        size = get_image_size(img_path)
-        if average_grayscale(img_path) > 255/2:
-            create_and_save_solid_image(size[0], size[1], color=(255, 255, 255), save_path=os.path.join(text_remove_path, filename))
-        else:
-            create_and_save_solid_image(size[0], size[1], color=(0, 0, 0), save_path=os.path.join(text_remove_path, filename))
-
-    # Step 9 : Translate the text in each cluster gemma3n:e2b gemma3:12b
-    prompt = """You translate English phrases into French in a natural and fluent style for webtoon dialogue.
-    Instruction: ONLY output a list containing the French translations of the given texts, in natural and fluent dialogue. Do not add explanations, notes, line breaks, or extra formatting. Remove or ignore any OCR artifacts like /, #, or other errors. If you absolutely do not know how to translate a word or phrase, leave it as-is. """+json.dumps(df_boxes["text"].tolist(), ensure_ascii=False)
-    system_prompt = f"You translate English phrases into French in a natural and fluent style for webtoon dialogue. ONLY output a list containing the French translations of the given texts. The list must have the same length as the original list, that is, {len(df_boxes['text'])} elements."
-
-    l_translated_upper = [] 
-    while len(l_translated_upper)!=len(df_boxes['text']) : # On vérifie que l'on a bien une traduction pour chaque élément
-        r = ollama_llm(prompt,system_prompt, model="gemma3:12b")
-        l_translated = json.loads(r)
-        l_translated_upper = [s.upper() for s in l_translated]
-        print(l_translated_upper)
-
-    df_boxes['translated_upper'] = l_translated_upper
-    df_translated = df_boxes.copy()
-    print(df_translated)
-
-    # Step 10 : Write translation on img
-    text_drawn_outputs = "outputs/text_drawn_outputs"
-    files = sorted(os.listdir(text_remove_path), key=natural_sort_key)
-    for i, filename in enumerate(files):
-        img_path = os.path.join(text_remove_path, filename)
-        text = df_translated["translated_upper"][i]
-        out_path = os.path.join(text_drawn_outputs, filename)
-
-        if average_grayscale(img_path) > 255/2:
-            fill_color=(0, 0, 0)
-        else:
-            fill_color=(255, 255, 255)
-
-        draw_centered_text(
-            image_path=img_path,
-            text=text,
-            font_path="inputs\\fonts\\Komika Text-FontZillion\\Fonts\\komtxtb_.ttf",
-            font_size=1000,
-            output_path=out_path,
-            margin=2,
-            fill_color=fill_color,
-            line_spacing_percent=-20
-        )
-
-    # Step 11 : Paste the translated text images onto the original image
-    img_text_drawn_outputs = os.path.join("outputs", "translated_chapter",os.path.splitext(os.path.relpath(file_path, "inputs/scans"))[0] + ".png")
-    os.makedirs(os.path.dirname(img_text_drawn_outputs), exist_ok=True)# Création du dossier parent si nécessaire
-    img = Image.open(image)
-    img.save(img_text_drawn_outputs, format="PNG")
-
-    for index, row in df_translated.iterrows():
-        x_min = row['x_min']
-        y_min = row['y_min']
-        cluster_id = row['cluster']
-        file_name = f"cluster_{cluster_id}.png"
-        print(f"x_min: {x_min}, y_min: {y_min}, file_name: {file_name}")
-        paste_image(img_text_drawn_outputs, text_drawn_outputs+"\\"+file_name, x_min, y_min, save_path=img_text_drawn_outputs)
+            print(result.boxes)
+        pipeline.save(result, output_path)
+        if page_index is not None:
+            page_index.add(page_hash, result.source, output_path)
+            in_flight.pop(page_hash, None)
+        for twin_output in twins.pop(result.source, []):
+            if os.path.abspath(twin_output) != os.path.abspath(output_path):
+                copy_file_atomic(output_path, twin_output)
+            print(f"♻️ Traduction réutilisée ({result.source}) : {twin_output}")
+        yield result
+
+def main(image, pipeline, output_path, glossary=None, page_index=None):
+    """
+    Traduit une page du disque et écrit le résultat dans output_path (extension donnée par le codec du pipeline).
+
+    Returns:
+    - PageResult ou None si la page a été ignorée ou réutilisée depuis l'index des doublons
+    """
+    return next(translate_pages([(image, output_path)], pipeline, glossary, page_index), None)
 
 if __name__ == '__main__':
     launch_exe(r"C:\Users\teo\AppData\Local\Programs\Ollama\ollama app.exe", timeout=1)
 
-    ocr = PaddleOCR(
-    use_doc_orientation_classify=False,
-    use_doc_unwarping=False,
-    use_textline_orientation=False,
-    lang='fr')
-    
+    # Le pipeline charge PaddleOCR (lang fr) et le modèle de reconnaissance seule
+    # pour la seconde passe sur les lignes à faible score
+    config = PipelineConfig(rec_model_name="latin_PP-OCRv5_mobile_rec")
+
+    # Cache des pages décodées (utile quand on relance souvent les mêmes chapitres)
+    page_cache = PageCache("outputs/page_cache", max_bytes=4 * 1024**3)
+
+    glossaries = {}  # un glossaire par série
+
+    # Effacement du texte par diffusion (ComfyUI) : passer USE_COMFYUI à True si le serveur tourne
+    USE_COMFYUI = False
+    eraser = ComfyUIEraser("127.0.0.1:8188", max_queued=4) if USE_COMFYUI else None
+    if eraser is not None:
+        eraser.connect()
+
+    # Index des pages déjà traitées (hash perceptuel) : doublons réutilisés, pubs/crédits ignorés
+    page_index = PageIndex("outputs/page_index.json")
+
+    # Plafond mémoire par worker : au-delà, OCR par bandes ; un profil mémoire est écrit par chapitre
+    memory_budget = MemoryBudget(max_rss=4 * 1024**3, tile_height=4000)
+
+    pipeline = Pipeline(config, page_cache=page_cache, eraser=eraser, memory_budget=memory_budget)
+
     base_dir = "inputs//scans"
     for root, dirs, files in os.walk(base_dir):
-        for file in files:
+        dirs.sort(key=natural_sort_key)
+        jobs = []
+        for file in sorted(files, key=natural_sort_key):
             if file.lower().endswith((".jpg", ".jpeg", ".png", ".webp")):
                 file_path = os.path.join(root, file)
-                print(file_path)
-
-                clean_folder("outputs/ocr_outputs")
-                clean_folder("outputs/text_remove_outputs")
-                clean_folder("outputs/text_drawn_outputs")
-                main(file_path,ocr)
+                jobs.append((file_path, os.path.join("outputs", "translated_chapter", os.path.relpath(file_path, "inputs/scans"))))
+
+        if jobs:
+            # Un chapitre à la fois, en flux : la page N est finalisée pendant que la page N+1 avance
+            series_name = os.path.relpath(jobs[0][0], "inputs/scans").split(os.sep)[0]
+            if series_name not in glossaries:
+                glossaries[series_name] = load_glossary(series_name)
+            for result in translate_pages(jobs, pipeline, glossary=glossaries[series_name], page_index=page_index):
+                del result
+                gc.collect()  # libère la page avant la suivante
+
+        if memory_budget.records:
+            memory_budget.write_report(os.path.join("outputs", "memory_profiles", os.path.relpath(root, "inputs/scans") + ".json"))
+
+    if eraser is not None:
+        eraser.close()
 
@@ -3,6 +3,9 @@ from paddleocr import PaddleOCR
 import pandas as pd
 from shapely.geometry import Polygon
 import networkx as nx
+import heapq
+import numpy as np
+from PIL import Image
 
 def extract_text_from_image(image_path, ocr):
      # model fr mieux pour l'anglais pas logique mais marche mieux...
@@ -30,10 +33,105 @@ def ocr_results_to_dataframe(result):
     df = pd.DataFrame(data)
     return df
 
+def extract_text_tiled(img_np, ocr, tile_height=4000, overlap=200):
+    """
+    OCR d'une page très haute par bandes horizontales qui se chevauchent, pour borner la mémoire.
+
+    Chaque bande est traitée puis libérée avant la suivante. Une ligne détectée dans une zone
+    de chevauchement n'est gardée que par la bande dont la partie centrale contient son centre.
+
+    Parameters:
+    - img_np : image (numpy.ndarray)
+    - ocr : instance PaddleOCR
+    - tile_height : hauteur d'une bande en pixels
+    - overlap : chevauchement entre deux bandes
+
+    Returns:
+    - DataFrame : mêmes colonnes que ocr_results_to_dataframe, coordonnées dans la page entière
+    """
+    h = img_np.shape[0]
+    step = max(1, tile_height - overlap)
+    frames = []
+    for top in range(0, h, step):
+        bottom = min(h, top + tile_height)
+        tile = np.ascontiguousarray(img_np[top:bottom])
+        df_tile = ocr_results_to_dataframe(extract_text_from_image(tile, ocr))
+        del tile
+
+        if not df_tile.empty:
+            for j in range(1, 5):
+                df_tile[f"y{j}"] = df_tile[f"y{j}"].astype("int64") + top  # évite un débordement int16
+            # partie centrale de la bande : la moitié du chevauchement revient à chaque voisine
+            core_top = top + overlap / 2 if top > 0 else 0
+            core_bottom = bottom - overlap / 2 if bottom < h else h
+            center_y = df_tile[["y1", "y2", "y3", "y4"]].mean(axis=1)
+            frames.append(df_tile[(center_y >= core_top) & (center_y < core_bottom)])
+
+        if bottom >= h:
+            break
+
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
 def filter_by_score(df, min_score=0.5):
     df_filtered = df[df['score'] >= min_score].reset_index(drop=True)
     return df_filtered
 
+def rerun_low_score_lines(df, img_np, rec_model, min_score=0.7, upscale=2.0, padding=4, batch_size=16):
+    """
+    Seconde passe de reconnaissance sur les lignes dont le score est inférieur à min_score.
+
+    Les polygones concernés sont découpés dans l'image (avec une petite marge), agrandis
+    d'un facteur upscale, puis envoyés en un seul lot au modèle de reconnaissance seule
+    (paddleocr.TextRecognition) : pas de nouvelle détection sur la page entière.
+    Une ligne n'est remplacée que si le nouveau score atteint min_score.
+
+    Parameters:
+    - df : DataFrame issu de ocr_results_to_dataframe
+    - img_np : image (numpy.ndarray) passée à l'OCR
+    - rec_model : modèle de reconnaissance PaddleOCR (méthode predict)
+    - min_score : seuil d'acceptation
+    - upscale : facteur d'agrandissement des crops
+    - padding : marge en pixels autour de chaque ligne
+    - batch_size : taille de lot pour le modèle
+
+    Returns:
+    - DataFrame : copie de df avec les lignes récupérées mises à jour
+    """
+    df_out = df.copy()
+    if df_out.empty:
+        return df_out
+
+    low = df_out[df_out['score'] < min_score]
+    h, w = img_np.shape[:2]
+    indices, crops = [], []
+    for idx, row in low.iterrows():
+        xs = [row['x1'], row['x2'], row['x3'], row['x4']]
+        ys = [row['y1'], row['y2'], row['y3'], row['y4']]
+        x_min, x_max = max(0, int(min(xs)) - padding), min(w, int(max(xs)) + padding)
+        y_min, y_max = max(0, int(min(ys)) - padding), min(h, int(max(ys)) + padding)
+        if x_max - x_min < 2 or y_max - y_min < 2:
+            continue
+        crop = Image.fromarray(np.asarray(img_np[y_min:y_max, x_min:x_max]))
+        crop = crop.resize((int(crop.width * upscale), int(crop.height * upscale)), Image.Resampling.LANCZOS)
+        indices.append(idx)
+        crops.append(np.array(crop))
+
+    if not crops:
+        return df_out
+
+    results = rec_model.predict(input=crops, batch_size=batch_size)
+    recovered = 0
+    for idx, res in zip(indices, results):
+        if res["rec_score"] >= min_score and res["rec_text"].strip():
+            df_out.at[idx, 'text'] = res["rec_text"]
+            df_out.at[idx, 'score'] = res["rec_score"]
+            recovered += 1
+
+    print(f"🔁 Seconde passe OCR : {recovered}/{len(crops)} lignes récupérées")
+    return df_out
+
 def cluster_polygons(df, *coord_cols, margin_factor=0.1):
 
     if len(coord_cols) % 2 != 0:
@@ -71,6 +169,128 @@ def cluster_polygons(df, *coord_cols, margin_factor=0.1):
     clusters = list(nx.connected_components(G))
     return clusters
 
+def cluster_lines_sweep(df, *coord_cols, gap_factor=0.8, min_gap=8, min_overlap=0.1):
+    """
+    Regroupe les lignes OCR en bulles par balayage vertical (sweep-line).
+
+    Les lignes sont triées par y ; seules les lignes encore "actives" (dont le bas,
+    augmenté de l'écart toléré, n'est pas dépassé) sont comparées à la ligne courante.
+    Quand peu de lignes se chevauchent verticalement la liste active reste courte,
+    mais le pire cas (nombreuses lignes côte à côte) reste quadratique.
+
+    Deux lignes sont fusionnées si :
+    - elles se suivent verticalement avec un écart <= max(gap_factor * hauteur de la plus haute, min_gap)
+      et se recouvrent horizontalement d'au moins min_overlap de la plus étroite,
+    - ou elles sont sur la même ligne visuelle avec un écart horizontal inférieur au même seuil.
+
+    Parameters:
+    - df : DataFrame avec les colonnes de coordonnées
+    - coord_cols : colonnes x1, y1, ..., x4, y4
+    - gap_factor : écart maximal toléré, relatif à la hauteur de ligne
+    - min_gap : écart toléré minimal en pixels (petites lignes : l'écart entre lignes y dépasse souvent gap_factor * hauteur)
+    - min_overlap : recouvrement horizontal minimal (fraction de la ligne la plus étroite)
+
+    Returns:
+    - list[set] : clusters d'indices de lignes, triés dans l'ordre de lecture
+    """
+    if len(coord_cols) % 2 != 0:
+        raise ValueError("Il faut un nombre pair de colonnes pour former les points (x, y).")
+
+    xs = df[list(coord_cols[0::2])].values
+    ys = df[list(coord_cols[1::2])].values
+    x_min, x_max = xs.min(axis=1), xs.max(axis=1)
+    y_min, y_max = ys.min(axis=1), ys.max(axis=1)
+    heights = (y_max - y_min).clip(min=1)
+
+    n = len(df)
+    parent = list(range(n))
+
+    def tolerance(h):
+        return max(gap_factor * h, min_gap)
+
+    # portée d'une ligne active : le seuil dépend de la plus haute des deux lignes comparées,
+    # on prend donc la plus haute ligne de la page pour ne jamais retirer une ligne trop tôt
+    reach = tolerance(heights.max()) if n else 0
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    order = sorted(range(n), key=lambda i: (y_min[i], x_min[i]))
+    active = []  # tas (fin de portée verticale, indice)
+    for i in order:
+        while active and active[0][0] < y_min[i]:
+            heapq.heappop(active)
+
+        for _, j in active:
+            gap = tolerance(max(heights[i], heights[j]))
+            overlap_x = min(x_max[i], x_max[j]) - max(x_min[i], x_min[j])
+            overlap_y = min(y_max[i], y_max[j]) - max(y_min[i], y_min[j])
+
+            if overlap_y > 0.5 * min(heights[i], heights[j]):
+                # même ligne visuelle : on tolère un petit écart horizontal
+                if -overlap_x <= gap:
+                    union(i, j)
+            elif y_min[i] - y_max[j] <= gap:
+                narrowest = min(x_max[i] - x_min[i], x_max[j] - x_min[j])
+                if overlap_x >= min_overlap * max(narrowest, 1):
+                    union(i, j)
+
+        heapq.heappush(active, (y_max[i] + reach, i))
+
+    groups = {}
+    for i in order:
+        groups.setdefault(find(i), set()).add(i)
+
+    # Ordre de lecture : de haut en bas, puis de gauche à droite
+    clusters = sorted(groups.values(), key=lambda c: (min(y_min[i] for i in c), min(x_min[i] for i in c)))
+    return clusters
+
+def group_lines(df, *coord_cols, method="polygon", margin_factor=0.1, gap_factor=0.8, min_gap=8):
+    """
+    Point d'entrée commun pour le regroupement des lignes en bulles.
+
+    Parameters:
+    - method : "polygon" (cluster_polygons, intersections de polygones agrandis)
+               ou "sweep" (cluster_lines_sweep, balayage vertical)
+
+    Returns:
+    - list[set] : clusters d'indices de lignes
+    """
+    if method == "polygon":
+        return cluster_polygons(df, *coord_cols, margin_factor=margin_factor)
+    if method == "sweep":
+        return cluster_lines_sweep(df, *coord_cols, gap_factor=gap_factor, min_gap=min_gap)
+    raise ValueError(f"Méthode de regroupement inconnue : {method}")
+
+def _reading_order(df_clus):
+    """Trie les lignes d'un cluster de haut en bas, puis de gauche à droite sur une même ligne visuelle."""
+    y_top = df_clus[['y1','y2','y3','y4']].min(axis=1)
+    y_bottom = df_clus[['y1','y2','y3','y4']].max(axis=1)
+    x_left = df_clus[['x1','x2','x3','x4']].min(axis=1)
+    df_sorted = df_clus.assign(_y=y_top, _x=x_left, _h=y_bottom - y_top).sort_values(['_y', '_x'])
+
+    # Les lignes dont le haut est dans la moitié supérieure de la ligne précédente sont sur la même ligne visuelle
+    row_ids = []
+    row, row_top, row_h = 0, None, None
+    for y, h in zip(df_sorted['_y'], df_sorted['_h']):
+        if row_top is not None and y - row_top > 0.5 * max(row_h, 1):
+            row += 1
+            row_top, row_h = y, h
+        elif row_top is None:
+            row_top, row_h = y, h
+        row_ids.append(row)
+
+    df_sorted = df_sorted.assign(_row=row_ids).sort_values(['_row', '_x'])
+    return df_sorted.drop(columns=['_y', '_x', '_h', '_row'])
+
 def add_cluster_column(df, clusters):
     df_copy = df.copy()
     cluster_col = [-1] * len(df_copy)  # valeur par défaut
@@ -83,12 +303,14 @@ def add_cluster_column(df, clusters):
     return df_copy
 
 
-def bounding_boxes_by_cluster_with_text(df):
+def bounding_boxes_by_cluster_with_text(df, reading_order=False):
     """
     Pour chaque cluster, crée un rectangle englobant et concatène les textes.
     
     Parameters:
     - df : DataFrame avec colonnes ['text','x1','y1','x2','y2','x3','y3','x4','y4','cluster']
+    - reading_order : si True, les textes sont concaténés dans l'ordre de lecture
+                      (haut -> bas, gauche -> droite) plutôt que dans l'ordre des lignes du DataFrame
     
     Returns:
     - df_boxes : DataFrame avec ['cluster', 'x_min', 'y_min', 'x_max', 'y_max', 'text']
@@ -98,6 +320,8 @@ def bounding_boxes_by_cluster_with_text(df):
 
     for clus in clusters:
         df_clus = df[df['cluster'] == clus]
+        if reading_order:
+            df_clus = _reading_order(df_clus)
         # Récupérer toutes les coordonnées x et y
         xs = df_clus[['x1','x2','x3','x4']].values.flatten()
         ys = df_clus[['y1','y2','y3','y4']].values.flatten()
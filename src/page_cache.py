@@ -0,0 +1,119 @@
+# Cache des pages décodées (tableaux RGB en .npy mappés en mémoire)
+import os
+import hashlib
+import tempfile
+import numpy as np
+from PIL import Image
+
+def file_content_hash(path, chunk_size=1 << 20):
+    """
+    Calcule l'empreinte SHA-1 du contenu d'un fichier (lu par blocs).
+
+    Parameters:
+    - path : chemin du fichier
+    - chunk_size : taille des blocs lus
+
+    Returns:
+    - str : empreinte hexadécimale
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class PageCache:
+    """
+    Cache disque des pages décodées d'un chapitre.
+
+    Chaque page est décodée une seule fois puis stockée en RGB brut dans
+    `<cache_dir>/<sha1>.npy`. Les lectures suivantes renvoient une vue
+    np.memmap en lecture seule (aucune copie, aucun décodage), partagée par
+    l'OCR, les statistiques de régions et la composition.
+
+    L'éviction est LRU : la date de modification du fichier sert de date de
+    dernier accès, et les pages les plus anciennes sont supprimées dès que
+    la taille totale dépasse max_bytes.
+    """
+
+    def __init__(self, cache_dir="outputs/page_cache", max_bytes=2 * 1024**3):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, img_path):
+        """
+        Renvoie la page RGB (np.memmap en lecture seule), en la décodant si nécessaire.
+
+        Parameters:
+        - img_path : chemin de l'image (PNG, JPEG, WebP...)
+
+        Returns:
+        - numpy.ndarray : vue (H, W, 3) uint8
+        """
+        key = file_content_hash(img_path)
+        entry = self._entry_path(key)
+
+        if os.path.exists(entry):
+            os.utime(entry)  # marque l'entrée comme récemment utilisée
+        else:
+            self._store(img_path, entry)
+            self.evict()
+
+        return np.load(entry, mmap_mode="r")
+
+    def _store(self, img_path, entry):
+        """Décode l'image et l'écrit de façon atomique dans le cache."""
+        with Image.open(img_path) as img:
+            arr = np.asarray(img.convert("RGB"))
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".", suffix=".npy")
+        os.close(fd)
+        try:
+            out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=arr.shape)
+            out[:] = arr
+            out.flush()
+            del out
+            os.replace(tmp_path, entry)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        print(f"🗃️ Page mise en cache : {img_path} -> {entry}")
+
+    def size(self):
+        """Taille totale (octets) des pages en cache."""
+        return sum(os.path.getsize(p) for p, _ in self._entries())
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy") and not name.startswith("."):
+                path = os.path.join(self.cache_dir, name)
+                entries.append((path, os.path.getmtime(path)))
+        return entries
+
+    def evict(self):
+        """Supprime les pages les moins récemment utilisées jusqu'à respecter max_bytes."""
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(os.path.getsize(p) for p, _ in entries)
+        # on garde toujours la page la plus récente, même si elle dépasse le budget à elle seule
+        for path, _ in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            size = os.path.getsize(path)
+            try:
+                os.unlink(path)
+            except OSError as e:
+                # fichier encore mappé ailleurs (Windows) : on réessaiera au prochain passage
+                print(f"Erreur lors de la suppression de {path}: {e}")
+                continue
+            total -= size
+
+    def clear(self):
+        """Vide entièrement le cache."""
+        for path, _ in self._entries():
+            os.unlink(path)
@@ -0,0 +1,280 @@
+# Pipeline réutilisable : une page en entrée, un résultat structuré en sortie (sans fichiers intermédiaires)
+import io
+import os
+import gc
+import time
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Union, Iterable, Iterator
+import numpy as np
+import pandas as pd
+from PIL import Image
+from ocr import extract_text_from_image, extract_text_tiled, ocr_results_to_dataframe, rerun_low_score_lines, filter_by_score, group_lines, add_cluster_column, bounding_boxes_by_cluster_with_text
+from img_tools import load_image_as_numpy, region_average_grayscale, draw_text_in_box, save_image_atomic
+from traduction import translate_texts
+
+COORD_COLS = ("x1", "y1", "x2", "y2", "x3", "y3", "x4", "y4")
+
+@dataclass
+class PipelineConfig:
+    """Paramètres explicites de la chaîne OCR -> regroupement -> traduction -> rendu."""
+    lang: str = "fr"  # model fr mieux pour l'anglais pas logique mais marche mieux...
+    min_score: float = 0.7
+    max_attempts: int = 3
+    grouping: str = "polygon"
+    margin_factor: float = 0.2  # grouping="polygon" : agrandissement des polygones
+    gap_factor: float = 0.8  # grouping="sweep" : écart toléré entre lignes, relatif à la hauteur de ligne
+    model: str = "gemma3:12b"
+    rec_model_name: Optional[str] = None  # ex. "latin_PP-OCRv5_mobile_rec" pour la seconde passe OCR
+    font_path: str = os.path.join("inputs", "fonts", "Komika Text-FontZillion", "Fonts", "komtxtb_.ttf")
+    font_size: int = 1000
+    text_margin: int = 2
+    line_spacing_percent: float = -20
+    text_layout: str = "auto"  # "auto", "wrap", "single" (SFX) ou "vertical" (boîtes étroites et hautes)
+    codec: str = "png"
+    compress_level: int = 1
+
+@dataclass
+class PageResult:
+    """
+    Résultat d'une page.
+
+    - lines : lignes OCR retenues (avec la colonne cluster)
+    - boxes : une ligne par bulle (x_min, y_min, x_max, y_max, text, translated_upper)
+    - image : page rendue (PIL.Image), la page d'origine si aucun texte n'a été trouvé
+    - timings : durée de chaque étape en secondes
+    """
+    source: Optional[str]
+    lines: pd.DataFrame
+    clusters: list
+    boxes: pd.DataFrame
+    image: Image.Image
+    timings: dict = field(default_factory=dict)
+
+@dataclass
+class _PendingPage:
+    """
+    Page préparée (OCR, traduction faits) dont les vignettes peuvent encore être chez l'eraser.
+    img_np vaut None en mode budget mémoire : la page est relue au moment de la composer.
+    """
+    page: object
+    source: str
+    img_np: Optional[np.ndarray]
+    lines: pd.DataFrame
+    clusters: list
+    boxes: pd.DataFrame
+    rects: list
+    is_light: list
+    erased: list
+    timings: dict
+
+class Pipeline:
+    """
+    Traduction d'une page en mémoire, réutilisable par la CLI, les benchmarks ou un service HTTP.
+
+    Les modèles (PaddleOCR, reconnaissance seule) sont chargés une seule fois à la construction ;
+    process() ne lit ni n'écrit aucun fichier (hors cache de pages éventuel).
+    """
+
+    def __init__(self, config=None, ocr=None, rec_model=None, page_cache=None, eraser=None, memory_budget=None):
+        self.config = config or PipelineConfig()
+        if ocr is None:
+            from paddleocr import PaddleOCR
+            ocr = PaddleOCR(
+                use_doc_orientation_classify=False,
+                use_doc_unwarping=False,
+                use_textline_orientation=False,
+                lang=self.config.lang)
+        if rec_model is None and self.config.rec_model_name:
+            from paddleocr import TextRecognition
+            rec_model = TextRecognition(model_name=self.config.rec_model_name)
+        self.ocr = ocr
+        self.rec_model = rec_model
+        self.page_cache = page_cache
+        self.eraser = eraser
+        self.memory_budget = memory_budget
+
+    def decode(self, page: Union[bytes, np.ndarray, str, os.PathLike]):
+        """Page (octets encodés, tableau RGB ou chemin) -> tableau RGB."""
+        if isinstance(page, np.ndarray):
+            return page
+        if isinstance(page, (bytes, bytearray, memoryview)):
+            with Image.open(io.BytesIO(page)) as img:
+                return np.array(img.convert("RGB"))
+        img_np, _ = load_image_as_numpy(os.fspath(page), None, cache=self.page_cache)
+        return img_np
+
+    def _ocr(self, img_np, source):
+        """Étapes 1 à 3 : OCR (avec nouvelles tentatives), seconde passe, filtrage par score."""
+        cfg = self.config
+        for attempt in range(1, cfg.max_attempts + 1):
+            print(f"🔄 OCR attempt {attempt} for {source}")
+            if self.memory_budget is not None and self.memory_budget.should_tile(img_np):
+                print(f"🧩 OCR par bandes de {self.memory_budget.tile_height}px pour {source}")
+                df = extract_text_tiled(img_np, self.ocr, self.memory_budget.tile_height, self.memory_budget.tile_overlap)
+            else:
+                result = extract_text_from_image(img_np, self.ocr)
+                df = ocr_results_to_dataframe(result)
+                del result  # les objets résultat de PaddleOCR gardent des copies de l'image
+
+            if self.rec_model is not None:
+                df = rerun_low_score_lines(df, img_np, self.rec_model, min_score=cfg.min_score)
+            filtered_df = filter_by_score(df, min_score=cfg.min_score) if not df.empty else df
+            del df
+
+            if not filtered_df.empty:
+                print(f"✅ OCR successful on attempt {attempt}")
+                return filtered_df
+            print(f"⚠️ No text detected on attempt {attempt}")
+        return filtered_df
+
+    def process(self, page, source=None, glossary=None) -> PageResult:
+        """
+        Traduit une page.
+
+        Parameters:
+        - page : octets encodés (PNG/JPEG/WebP), numpy.ndarray RGB, ou chemin
+        - source : nom de la page (journalisation)
+        - glossary : glossaire de la série (optionnel)
+
+        Returns:
+        - PageResult
+        """
+        return self._finish(self._prepare(page, source, glossary))
+
+    def _prepare(self, page, source=None, glossary=None, decoded=None):
+        """
+        Étapes 1 à 9 : OCR, regroupement, vignettes envoyées à l'eraser (sans attendre), traduction.
+        decoded : Future du décodage anticipé de la page (process_many).
+        """
+        cfg = self.config
+        timings = {}
+        page_source = source or (os.fspath(page) if isinstance(page, (str, os.PathLike)) else None)
+        source = page_source or "<mémoire>"
+        if self.memory_budget is not None:
+            self.memory_budget.start_page(source)
+
+        t = time.perf_counter()
+        img_np = decoded.result() if decoded is not None else self.decode(page)
+        decoded = None  # le Future garderait la page en vie
+        timings["decode"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        lines = self._ocr(img_np, source)
+        timings["ocr"] = time.perf_counter() - t
+        if self.memory_budget is not None:
+            self.memory_budget.mark("ocr")
+
+        if lines.empty:
+            return _PendingPage(page, source, img_np, lines, [], pd.DataFrame(), [], [], [], timings)
+
+        # Étapes 4 à 6 : regroupement en bulles et rectangles englobants
+        t = time.perf_counter()
+        clusters = group_lines(lines, *COORD_COLS, method=cfg.grouping, margin_factor=cfg.margin_factor, gap_factor=cfg.gap_factor)
+        lines = add_cluster_column(lines, clusters)
+        boxes = bounding_boxes_by_cluster_with_text(lines, reading_order=(cfg.grouping == "sweep"))
+        h, w = img_np.shape[:2]
+        rects = [(max(0, int(r.x_min)), max(0, int(r.y_min)), min(w, int(r.x_max)), min(h, int(r.y_max)))
+                 for r in boxes.itertuples()]
+        timings["group"] = time.perf_counter() - t
+
+        # Étape 7-8 : luminosité des bulles ; avec un eraser, les vignettes partent en file d'attente
+        # et ne sont récupérées que dans _finish (diffusion, LLM et pages suivantes en parallèle)
+        t = time.perf_counter()
+        is_light = [region_average_grayscale(img_np, rect) > 255/2 for rect in rects]
+        erased = []
+        if self.eraser is not None:
+            erased = [self.eraser.submit(Image.fromarray(np.ascontiguousarray(img_np[y0:y1, x0:x1])))
+                      for x0, y0, x1, y1 in rects]
+        if self.memory_budget is not None:
+            # Budget mémoire : la page n'est pas gardée pendant la traduction (l'étape la plus longue),
+            # _finish la relira (depuis le cache de pages pour un chemin)
+            img_np = None
+            gc.collect()
+            self.memory_budget.mark("erase")
+        timings["erase_submit"] = time.perf_counter() - t
+
+        # Étape 9 : traduction
+        t = time.perf_counter()
+        boxes["translated_upper"] = translate_texts(boxes["text"].tolist(), model=cfg.model, glossary=glossary, source=page_source)
+        timings["translate"] = time.perf_counter() - t
+
+        return _PendingPage(page, source, img_np, lines, clusters, boxes, rects, is_light, erased, timings)
+
+    def _finish(self, pending):
+        """Étapes 10-11 : récupération des vignettes nettoyées, effacement puis texte, directement sur la page."""
+        cfg = self.config
+        t = time.perf_counter()
+        img_np = pending.img_np if pending.img_np is not None else self.decode(pending.page)
+        pending.img_np = None
+        page_img = Image.fromarray(np.asarray(img_np)).copy()
+        del img_np
+        is_light = list(pending.is_light)
+        for i, rect in enumerate(pending.rects):
+            if pending.erased:
+                clean = pending.erased[i].result(timeout=self.eraser.timeout)
+                page_img.paste(clean, rect[:2])
+                is_light[i] = region_average_grayscale(np.asarray(clean), (0, 0, clean.width, clean.height)) > 255/2
+            else:
+                page_img.paste((255, 255, 255) if is_light[i] else (0, 0, 0), rect)
+
+            draw_text_in_box(
+                page_img, rect, pending.boxes["translated_upper"].iloc[i],
+                font_path=cfg.font_path,
+                font_size=cfg.font_size,
+                margin=cfg.text_margin,
+                fill_color=(0, 0, 0) if is_light[i] else (255, 255, 255),
+                line_spacing_percent=cfg.line_spacing_percent,
+                mode=cfg.text_layout
+            )
+        pending.timings["render"] = time.perf_counter() - t
+        if self.memory_budget is not None:
+            self.memory_budget.mark("compose", page=pending.source)
+
+        return PageResult(pending.source, pending.lines, pending.clusters, pending.boxes, page_img, pending.timings)
+
+    def process_many(self, pages: Iterable, glossary=None, prefetch=None) -> Iterator[PageResult]:
+        """
+        Traduit une suite de pages et renvoie les résultats au fur et à mesure, dans l'ordre.
+
+        - Les `prefetch` pages suivantes sont décodées en arrière-plan pendant le traitement de la page courante
+          (par défaut 1, et 0 avec un budget mémoire : une seule page décodée à la fois).
+        - Avec un eraser, la page N n'est finalisée (attente des vignettes, collage, texte) qu'une fois
+          l'OCR et la traduction de la page N+1 faits : la diffusion de la page N tourne pendant ce temps.
+        - Une fois le plafond du budget mémoire dépassé, plus de décodage anticipé ni de recouvrement :
+          chaque page est finalisée avant de passer à la suivante.
+        """
+        if prefetch is None:
+            prefetch = 0 if self.memory_budget is not None else 1
+        previous = None
+        for current in self._prepare_many(pages, glossary, prefetch):
+            if previous is not None:
+                yield self._finish(previous)
+            if self.eraser is None or self._over_budget():
+                yield self._finish(current)
+                current = None
+            previous = current
+        if previous is not None:
+            yield self._finish(previous)
+
+    def _over_budget(self):
+        return self.memory_budget is not None and self.memory_budget.over_budget
+
+    def _prepare_many(self, pages, glossary, prefetch):
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            queue = []
+            for page in pages:
+                ahead = 0 if self._over_budget() else prefetch
+                queue.append((page, pool.submit(self.decode, page) if ahead else None))
+                while len(queue) > ahead:  # plafond dépassé : les pages déjà décodées à l'avance sont traitées
+                    yield self._prepare_queued(*queue.pop(0), glossary)
+            while queue:
+                yield self._prepare_queued(*queue.pop(0), glossary)
+
+    def _prepare_queued(self, page, decoded, glossary):
+        source = os.fspath(page) if isinstance(page, (str, os.PathLike)) else None
+        return self._prepare(page, source=source, glossary=glossary, decoded=decoded)
+
+    def save(self, result: PageResult, output_path):
+        """Écrit la page rendue (codec et compression de la configuration), de façon atomique."""
+        return save_image_atomic(result.image, output_path, codec=self.config.codec, compress_level=self.config.compress_level)
@@ -4,14 +4,27 @@ Webtoon static site generator (vertical scrolling)
 
 Place this script next to your `outputs/translated_chapter` folder (or point --source to it),
 then run it. It will generate a static site in the output folder (default: site_output).
+Open index.html directly from disk, or use --serve to preview it through a caching local HTTP server.
 """
 import argparse
+import gzip
+import hashlib
 import os
 import shutil
 import sys
 from pathlib import Path
 import html
+import json
 import re
+import threading
+from email.utils import formatdate
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from PIL import Image
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 def natural_key(s: str):
     parts = re.split(r'(\d+)', s)
@@ -39,14 +52,75 @@ def list_images(chapter_dir: Path):
 def ensure_dir(p: Path):
     p.mkdir(parents=True, exist_ok=True)
 
-def copy_images(img_paths, dst_dir: Path):
+def file_hash(path: Path, length: int = 10):
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()[:length]
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{10}\.(png|jpe?g|webp)$', re.IGNORECASE)
+
+def copy_images(img_paths, dst_dir: Path, build_cache: dict = None):
+    """
+    Copy images under content-hashed names (page_1.<hash>.png) so browsers can cache them forever.
+
+    build_cache maps a source path to its last known (mtime, size, hash, width, height):
+    unchanged sources are neither re-hashed, re-measured nor re-copied.
+    Returns one manifest entry per page: {"name", "file", "w", "h", "hash"}.
+    """
     ensure_dir(dst_dir)
-    copied = []
+    build_cache = {} if build_cache is None else build_cache
+    pages = []
     for img in img_paths:
-        dst = dst_dir / img.name
-        shutil.copy2(img, dst)
-        copied.append(dst)
-    return copied
+        st = img.stat()
+        cached = build_cache.get(str(img))
+        if cached and cached['mtime_ns'] == st.st_mtime_ns and cached['size'] == st.st_size:
+            digest, w, h = cached['hash'], cached['w'], cached['h']
+        else:
+            digest = file_hash(img)
+            with Image.open(img) as im:  # header only, no decode
+                w, h = im.size
+            build_cache[str(img)] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'hash': digest, 'w': w, 'h': h}
+        dst = dst_dir / f"{img.stem}.{digest}{img.suffix.lower()}"
+        if not dst.exists():  # same name = same content, nothing to copy
+            shutil.copy2(img, dst)
+        pages.append({'name': img.name, 'file': dst.name, 'w': w, 'h': h, 'hash': digest})
+    # remove derivatives of pages that changed or disappeared
+    keep = {p['file'] for p in pages}
+    for old in dst_dir.iterdir():
+        if old.is_file() and HASHED_NAME.search(old.name) and old.name not in keep:
+            old.unlink()
+    return pages
+
+def write_json_if_changed(path: Path, obj):
+    """Write compact JSON (precompressed) only when its content changed, so ETags stay stable."""
+    text = json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    if path.exists() and path.read_text(encoding='utf-8') == text:
+        return False
+    write_text_precompressed(path, text)
+    return True
+
+def write_manifest(path: Path, obj):
+    """
+    Write manifest.json plus manifest.js (window.manifest = ...): browsers block fetch() on file://,
+    so pages opened from disk read the script, and served pages fall back to the JSON if it is missing.
+    """
+    changed = write_json_if_changed(path, obj)
+    js_path = path.with_suffix('.js')
+    js = 'window.manifest=' + json.dumps(obj, ensure_ascii=False, separators=(',', ':')) + ';'
+    if not js_path.exists() or js_path.read_text(encoding='utf-8') != js:
+        write_text_precompressed(js_path, js)
+        changed = True
+    return changed
+
+def write_text_precompressed(path: Path, text: str):
+    """Write a text file plus .gz (and .br when brotli is installed) variants for the server."""
+    data = text.encode('utf-8')
+    path.write_bytes(data)
+    Path(str(path) + '.gz').write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        Path(str(path) + '.br').write_bytes(brotli.compress(data, quality=11))
 
 BASE_CSS = """
 body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Arial;margin:0;background:#111;color:#eee}
@@ -57,6 +131,8 @@ body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,Arial;margin
 .chapter-list{list-style:none;padding:0}
 .chapter-list li{margin:6px 0}
 .img-page{width:100%;height:auto;display:block;margin:8px 0;box-shadow:0 4px 18px rgba(0,0,0,0.6)}
+.page-slot{width:100%;margin:8px 0;background:#1b1b1b}
+.page-slot .img-page{height:100%;margin:0}
 .navbar{display:flex;gap:8px;align-items:center}
 .button{background:#2b6ef6;color:white;padding:8px 12px;border-radius:6px;text-decoration:none}
 .footer{margin-top:24px;font-size:0.9em;opacity:0.8}
@@ -85,32 +161,66 @@ CHAPTER_HTML = """
       {next_chap_link}
     </div>
   </div>
-  <main>
-    {images_html}
-  </main>
+  <main id="reader"></main>
   <div class="footer">Use arrow keys ↑↓ to navigate images, ←→ for chapters.</div>
 </div>
+<script src="../manifest.js"></script>
 <script>
-let images = Array.from(document.querySelectorAll('.img-page'));
-let currentIndex = 0;
-function showIndex(i){
-  currentIndex = Math.max(0, Math.min(images.length-1, i));
-  const el = images[currentIndex];
-  if(el) el.scrollIntoView({behavior:'smooth', block:'start'});
-}
-document.addEventListener('keydown', e=>{
-  if(e.key==='ArrowDown') showIndex(currentIndex+1);
-  if(e.key==='ArrowUp') showIndex(currentIndex-1);
-  if(e.key==='ArrowLeft' && window.prevChap) location.href=window.prevChap;
-  if(e.key==='ArrowRight' && window.nextChap) location.href=window.nextChap;
-});
+window.chapterSlug={chapter_slug_js};
 window.prevChap={prev_chap_url_js};
 window.nextChap={next_chap_url_js};
 </script>
+<script>{reader_js}</script>
 </body>
 </html>
 """
 
+# Chapter reader: pages come from the series manifest. Every page gets a placeholder sized
+# from its dimensions, and an <img> only exists while the page is near the viewport.
+READER_JS = """
+(async function(){
+  const manifest = window.manifest || await (await fetch('../manifest.json', {cache: 'no-cache'})).json();
+  const chapter = manifest.chapters.find(c => c.slug === window.chapterSlug);
+  const reader = document.getElementById('reader');
+  const slots = chapter.pages.map((p, i) => {
+    const slot = document.createElement('div');
+    slot.className = 'page-slot';
+    slot.style.aspectRatio = p.w + ' / ' + p.h;
+    slot.dataset.index = i;
+    reader.appendChild(slot);
+    return slot;
+  });
+  const observer = new IntersectionObserver(entries => {
+    for (const e of entries) {
+      const slot = e.target, page = chapter.pages[+slot.dataset.index];
+      if (e.isIntersecting && !slot.firstChild) {
+        const img = new Image();
+        img.className = 'img-page';
+        img.decoding = 'async';
+        img.alt = page.name;
+        img.src = '../' + page.src;
+        slot.appendChild(img);
+      } else if (!e.isIntersecting && slot.firstChild) {
+        slot.removeChild(slot.firstChild);
+      }
+    }
+  }, {rootMargin: '150% 0px'});
+  slots.forEach(s => observer.observe(s));
+
+  let currentIndex = 0;
+  function showIndex(i){
+    currentIndex = Math.max(0, Math.min(slots.length-1, i));
+    slots[currentIndex].scrollIntoView({behavior:'smooth', block:'start'});
+  }
+  document.addEventListener('keydown', e=>{
+    if(e.key==='ArrowDown') showIndex(currentIndex+1);
+    if(e.key==='ArrowUp') showIndex(currentIndex-1);
+    if(e.key==='ArrowLeft' && window.prevChap) location.href=window.prevChap;
+    if(e.key==='ArrowRight' && window.nextChap) location.href=window.nextChap;
+  });
+})();
+"""
+
 SERIES_INDEX_HTML = """
 <!doctype html>
 <html lang="en">
@@ -131,15 +241,29 @@ SERIES_INDEX_HTML = """
       <a class="button" href="{root_index_rel}">Home</a>
     </div>
   </div>
-  <ul class="chapter-list">
-    {chapters_li}
-  </ul>
+  <ul class="chapter-list" id="chapters"></ul>
   <div class="footer">Generated by webtoon_site_generator.py</div>
 </div>
+<script src="manifest.js"></script>
+<script>{series_js}</script>
 </body>
 </html>
 """
 
+SERIES_INDEX_JS = """
+(window.manifest ? Promise.resolve(window.manifest) : fetch('manifest.json', {cache: 'no-cache'}).then(r => r.json())).then(manifest => {
+  const list = document.getElementById('chapters');
+  for (const c of manifest.chapters) {
+    const li = document.createElement('li');
+    const a = document.createElement('a');
+    a.href = c.slug + '/index.html';
+    a.textContent = c.name;
+    li.append(a, ' (' + c.pages.length + ' pages)');
+    list.appendChild(li);
+  }
+});
+"""
+
 ROOT_INDEX_HTML = """
 <!doctype html>
 <html lang="en">
@@ -155,22 +279,66 @@ ROOT_INDEX_HTML = """
     <h1 style="margin:0">Webtoon Reader</h1>
     <div class="navbar"><span class="button">Local static site</span></div>
   </div>
-  <div class="series-list">
-    {series_cards}
-  </div>
+  <div class="series-list" id="series"></div>
   <div class="footer">Open a series to read chapters. Generated by generator.</div>
 </div>
+<script src="manifest.js"></script>
+<script>{root_js}</script>
 </body>
 </html>
 """
 
+ROOT_INDEX_JS = """
+(window.manifest ? Promise.resolve(window.manifest) : fetch('manifest.json', {cache: 'no-cache'}).then(r => r.json())).then(manifest => {
+  const list = document.getElementById('series');
+  for (const s of manifest.series) {
+    const card = document.createElement('a');
+    card.className = 'series-card';
+    card.href = s.slug + '/index.html';
+    const title = document.createElement('strong');
+    title.textContent = s.name;
+    const count = document.createElement('div');
+    count.style.cssText = 'font-size:0.9em;opacity:0.8';
+    count.textContent = s.chapters + ' chapters';
+    card.append(title, count);
+    list.appendChild(card);
+  }
+});
+"""
+
+def accepts_encoding(header: str, encoding: str):
+    """
+    True if an Accept-Encoding header allows a content coding: tokens are parsed with their
+    q-values, so "gzip;q=0" refuses gzip, and "*" covers codings that are not listed.
+    """
+    qvalues = {}
+    for token in header.split(','):
+        coding, _, params = token.strip().partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding:
+            qvalues[coding.strip().lower()] = q
+    return qvalues.get(encoding, qvalues.get('*', 0.0)) > 0
+
 def make_safe_filename(name: str):
     return re.sub(r'[^A-Za-z0-9_\-\. ]+', '_', name).strip()
 
 def generate(site_out: Path, source: Path):
+    """
+    Build (incrementally) the site: hashed page copies, one JSON manifest per series
+    (chapters, page dimensions, derivative URLs, hashes), a root manifest listing the
+    series, and small HTML shells that render from those manifests (loaded as manifest.js
+    so the site also works from file://).
+    """
     ensure_dir(site_out)
     series_dirs = find_series(source)
-    series_cards_html = []
+    root_manifest = {'series': []}
     for sdir in series_dirs:
         series_name = sdir.name
         safe_series = make_safe_filename(series_name)
@@ -178,38 +346,184 @@ def generate(site_out: Path, source: Path):
         ensure_dir(series_out)
         chapters = find_chapters(sdir)
         if not chapters: continue
-        chapters_info = []
+
+        cache_path = series_out / '.build-cache.json'
+        build_cache = json.loads(cache_path.read_text(encoding='utf-8')) if cache_path.exists() else {}
+        manifest = {'series': series_name, 'chapters': []}
         for ch in chapters:
             chapter_name = ch.name if ch != sdir else 'chapter'
             safe_ch = make_safe_filename(chapter_name)
-            ch_out = series_out / safe_ch
             imgs = list_images(ch)
             if not imgs: continue
-            copied = copy_images(imgs, ch_out)
-            chapters_info.append((chapter_name, safe_ch, ch_out, copied))
-        for idx, (chapter_name, safe_ch, ch_out, copied) in enumerate(chapters_info):
+            pages = copy_images(imgs, series_out / safe_ch, build_cache)
+            manifest['chapters'].append({
+                'name': chapter_name,
+                'slug': safe_ch,
+                'pages': [{'name': p['name'], 'src': f"{safe_ch}/{p['file']}", 'w': p['w'], 'h': p['h'], 'hash': p['hash']} for p in pages],
+            })
+        cache_path.write_text(json.dumps(build_cache), encoding='utf-8')
+        write_manifest(series_out / 'manifest.json', manifest)
+
+        chapters_info = manifest['chapters']
+        for idx, chapter in enumerate(chapters_info):
+            ch_out = series_out / chapter['slug']
             rel_to_series_index = os.path.relpath(series_out / 'index.html', ch_out)
-            prev_link = f'<a class="button" href="{html.escape(chapters_info[idx-1][1])}/index.html">◀ Prev chapter</a>' if idx>0 else ''
-            next_link = f'<a class="button" href="{html.escape(chapters_info[idx+1][1])}/index.html">Next chapter ▶</a>' if idx<len(chapters_info)-1 else ''
-            prev_js = f'"{html.escape(chapters_info[idx-1][1])}/index.html"' if idx>0 else 'null'
-            next_js = f'"{html.escape(chapters_info[idx+1][1])}/index.html"' if idx<len(chapters_info)-1 else 'null'
-            images_html = '\n'.join([f'<img class="img-page" src="{html.escape(p.name)}" alt="{html.escape(p.name)}">' for p in copied])
-            chapter_html = CHAPTER_HTML.format(series=html.escape(series_name), chapter_name=html.escape(chapter_name), css=BASE_CSS, images_html=images_html, series_index_rel=html.escape(rel_to_series_index), prev_chap_link=prev_link, next_chap_link=next_link, prev_chap_url_js=prev_js, next_chap_url_js=next_js)
-            (ch_out / 'index.html').write_text(chapter_html, encoding='utf-8')
-        chapters_li = '\n'.join([f'<li><a href="{html.escape(c[1])}/index.html">{html.escape(c[0])}</a> ({len(c[3])} pages)</li>' for c in chapters_info])
-        series_index_html = SERIES_INDEX_HTML.format(series=html.escape(series_name), css=BASE_CSS, chapters_li=chapters_li, root_index_rel=os.path.relpath(site_out / 'index.html', series_out))
-        (series_out / 'index.html').write_text(series_index_html, encoding='utf-8')
-        series_cards_html.append(f'<a class="series-card" href="{html.escape(safe_series)}/index.html"><strong>{html.escape(series_name)}</strong><div style="font-size:0.9em;opacity:0.8">{len(chapters_info)} chapters</div></a>')
-    root_html = ROOT_INDEX_HTML.format(css=BASE_CSS, series_cards='\n'.join(series_cards_html))
-    (site_out / 'index.html').write_text(root_html, encoding='utf-8')
+            prev_link = f'<a class="button" href="../{html.escape(chapters_info[idx-1]["slug"])}/index.html">◀ Prev chapter</a>' if idx>0 else ''
+            next_link = f'<a class="button" href="../{html.escape(chapters_info[idx+1]["slug"])}/index.html">Next chapter ▶</a>' if idx<len(chapters_info)-1 else ''
+            prev_js = json.dumps(f'../{chapters_info[idx-1]["slug"]}/index.html') if idx>0 else 'null'
+            next_js = json.dumps(f'../{chapters_info[idx+1]["slug"]}/index.html') if idx<len(chapters_info)-1 else 'null'
+            chapter_html = CHAPTER_HTML.format(series=html.escape(series_name), chapter_name=html.escape(chapter['name']), css=BASE_CSS, series_index_rel=html.escape(rel_to_series_index), prev_chap_link=prev_link, next_chap_link=next_link, chapter_slug_js=json.dumps(chapter['slug']), prev_chap_url_js=prev_js, next_chap_url_js=next_js, reader_js=READER_JS)
+            write_text_precompressed(ch_out / 'index.html', chapter_html)
+        series_index_html = SERIES_INDEX_HTML.format(series=html.escape(series_name), css=BASE_CSS, root_index_rel=os.path.relpath(site_out / 'index.html', series_out), series_js=SERIES_INDEX_JS)
+        write_text_precompressed(series_out / 'index.html', series_index_html)
+        root_manifest['series'].append({'name': series_name, 'slug': safe_series, 'chapters': len(chapters_info)})
+    write_manifest(site_out / 'manifest.json', root_manifest)
+    root_html = ROOT_INDEX_HTML.format(css=BASE_CSS, root_js=ROOT_INDEX_JS)
+    write_text_precompressed(site_out / 'index.html', root_html)
     print(f"Site generated to: {site_out.resolve()}")
 
+class CachingHandler(SimpleHTTPRequestHandler):
+    """
+    Static file handler for the generated site:
+    - strong ETags (content hash) and 304 answers to If-None-Match
+    - Cache-Control: immutable for content-hashed images, revalidation for everything else
+    - precompressed .br / .gz variants served according to Accept-Encoding
+    - single-range requests (206 / 416) and HTTP/1.1 keep-alive
+    """
+    protocol_version = 'HTTP/1.1'
+    _etags = {}
+    _etags_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def etag_for(self, path: str):
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        with self._etags_lock:
+            tag = self._etags.get(key)
+        if tag is None:
+            tag = '"' + file_hash(Path(path), 16) + '"'
+            with self._etags_lock:
+                self._etags[key] = tag
+        return tag
+
+    def do_GET(self):
+        self.send_file(head_only=False)
+
+    def do_HEAD(self):
+        self.send_file(head_only=True)
+
+    def send_file(self, head_only: bool):
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not self.path.split('?', 1)[0].endswith('/'):
+                # relative links in index.html need the trailing slash
+                self.send_response(301)
+                self.send_header('Location', self.path.split('?', 1)[0] + '/')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            path = os.path.join(path, 'index.html')
+        if not os.path.isfile(path):
+            self.send_error(404, 'File not found')
+            return
+
+        ctype = self.guess_type(path)
+        encoding = None
+        accepted = self.headers.get('Accept-Encoding', '')
+        variants = [(enc, path + ext) for enc, ext in (('br', '.br'), ('gzip', '.gz')) if os.path.isfile(path + ext)]
+        for enc, variant in variants:
+            if accepts_encoding(accepted, enc):
+                path, encoding = variant, enc
+                break
+
+        etag = self.etag_for(path)
+        if HASHED_NAME.search(path):
+            cache_control = 'public, max-age=31536000, immutable'
+        else:
+            cache_control = 'no-cache'
+
+        common = [('ETag', etag), ('Cache-Control', cache_control), ('Accept-Ranges', 'bytes'),
+                  ('Last-Modified', formatdate(os.path.getmtime(path), usegmt=True))]
+        if encoding:
+            common.append(('Content-Encoding', encoding))
+        if variants:
+            # the response depends on Accept-Encoding even when the identity copy is sent
+            common.append(('Vary', 'Accept-Encoding'))
+
+        if etag in [t.strip() for t in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            for k, v in common:
+                self.send_header(k, v)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        status = 200
+        range_header = self.headers.get('Range')
+        if range_header and not encoding and self.headers.get('If-Range', etag) == etag:
+            m = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+            if m and (m.group(1) or m.group(2)):
+                if m.group(1):
+                    start = int(m.group(1))
+                    end = min(int(m.group(2)), size - 1) if m.group(2) else size - 1
+                else:  # suffix range: last N bytes
+                    start = max(0, size - int(m.group(2)))
+                if start > end or start >= size:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                status = 206
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header('Content-Type', ctype)
+        for k, v in common:
+            self.send_header(k, v)
+        if status == 206:
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+        if head_only or not length:
+            return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            remaining = length
+            while remaining > 0:
+                chunk = f.read(min(1 << 16, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+def serve(site_out: Path, host: str = '127.0.0.1', port: int = 8000):
+    handler = lambda *a, **kw: CachingHandler(*a, directory=str(site_out), **kw)
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Serving {site_out.resolve()} on http://{host}:{port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
 def main():
     parser = argparse.ArgumentParser(description='Generate static vertical-scrolling webtoon site')
     parser.add_argument('--source', '-s', default='outputs/translated_chapter')
     parser.add_argument('--out', '-o', default='site_output')
+    parser.add_argument('--serve', action='store_true', help='serve the generated site with caching headers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', '-p', type=int, default=8000)
     args = parser.parse_args()
     generate(Path(args.out), Path(args.source))
+    if args.serve:
+        serve(Path(args.out), args.host, args.port)
 
 if __name__ == '__main__':
     main()
@@ -6,6 +6,9 @@ import subprocess
 from tqdm import tqdm
 import psutil
 import re
+import gc
+import json
+import tempfile
 
 def clean_folder(folder_path):
     """
@@ -56,6 +59,98 @@ def launch_exe(path_to_exe, timeout=15):
             return
     raise TimeoutError(f"{exe_name} n'a pas démarré dans les {timeout} secondes.")
 
+def copy_file_atomic(src, dst):
+    """
+    Copie un fichier de façon atomique (fichier temporaire dans le dossier de destination + os.replace),
+    pour qu'aucune copie partielle n'apparaisse dans le dossier de sortie.
+    """
+    out_dir = os.path.dirname(dst) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix=".", suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return dst
+
 def natural_sort_key(s):
     # Sépare les nombres et le texte pour un tri naturel
-    return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
\ No newline at end of file
+    return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
+
+def current_rss():
+    """Mémoire résidente (RSS) du processus courant, en octets."""
+    return psutil.Process(os.getpid()).memory_info().rss
+
+class MemoryBudget:
+    """
+    Plafond de mémoire (RSS) pour un worker, avec relevé par étape.
+
+    - mark(stage) : enregistre le RSS courant pour une étape de la page en cours ; True si le plafond est dépassé
+    - should_tile(img_np) : True si traiter la page d'un bloc risque de dépasser le plafond
+      (RSS actuel + estimation du pic de l'OCR > max_rss), ou si le plafond a déjà été dépassé
+    - over_budget : True dès qu'un relevé a dépassé le plafond
+    - write_report(path) : écrit le profil mémoire (JSON) et repart de zéro
+
+    Application du plafond : avant l'OCR, une page dont le pic estimé dépasse le plafond est lue par bandes.
+    Dès qu'un relevé (OCR, envoi à l'eraser, composition) dépasse le plafond, le worker passe en mode
+    économe jusqu'à la fin : les pages hautes sont toujours lues par bandes et Pipeline.process_many
+    ne décode plus de page à l'avance ni ne garde de page en recouvrement. Ce n'est pas une limite dure :
+    l'étape en cours au moment du dépassement se termine normalement.
+    """
+
+    def __init__(self, max_rss=4 * 1024**3, tile_height=4000, tile_overlap=200, ocr_overhead=8):
+        self.max_rss = max_rss
+        self.tile_height = tile_height
+        self.tile_overlap = tile_overlap
+        self.ocr_overhead = ocr_overhead  # pic de l'OCR ≈ ocr_overhead x taille de l'image RGB
+        self.records = []
+        self.page = None
+        self.over_budget = False
+
+    def start_page(self, page):
+        self.page = page
+        gc.collect()
+        self.mark("start")
+
+    def mark(self, stage, page=None):
+        """
+        page : page concernée si ce n'est pas la dernière commencée (pages traitées en recouvrement).
+
+        Returns:
+        - bool : True si le RSS dépasse le plafond (le worker passe alors en mode économe)
+        """
+        rss = current_rss()
+        self.records.append({"page": page if page is not None else self.page, "stage": stage, "rss": rss})
+        if rss > self.max_rss:
+            if not self.over_budget:
+                print(f"⚠️ RSS au-dessus du plafond ({rss / 1024**2:.0f} Mo > {self.max_rss / 1024**2:.0f} Mo) à l'étape {stage} : "
+                      "OCR par bandes et plus de pages en recouvrement")
+            self.over_budget = True
+            return True
+        return False
+
+    def should_tile(self, img_np):
+        if img_np.shape[0] <= self.tile_height:
+            return False
+        return self.over_budget or current_rss() + img_np.nbytes * self.ocr_overhead > self.max_rss
+
+    def write_report(self, path):
+        """Écrit le profil mémoire (pic par page et relevés détaillés) puis vide les relevés."""
+        pages = {}
+        for rec in self.records:
+            pages[rec["page"]] = max(pages.get(rec["page"], 0), rec["rss"])
+        report = {
+            "max_rss": self.max_rss,
+            "peak_rss": max((r["rss"] for r in self.records), default=0),
+            "peak_rss_by_page": pages,
+            "records": self.records,
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Profil mémoire écrit dans {path} (pic : {report['peak_rss'] / 1024**2:.0f} Mo)")
+        self.records = []
@@ -1,6 +1,7 @@
 # Translation module
 import ollama
 import re
+import json
 
 def ollama_llm(prompt,system_prompt="", model="gemma3n:e2b"):
     response = ollama.chat( 
@@ -14,4 +15,37 @@ def ollama_llm(prompt,system_prompt="", model="gemma3n:e2b"):
     response_content = response['message']['content']
     final_answer = re.sub(r'<think>.*?</think>', '', response_content, flags=re.DOTALL).strip()
 
-    return final_answer
\ No newline at end of file
+    return final_answer
+
+def translate_texts(texts, model="gemma3:12b", glossary=None, source=None):
+    """
+    Traduit une liste de textes (une bulle par élément) en français, en majuscules.
+
+    Parameters:
+    - texts : liste de textes anglais
+    - model : modèle ollama
+    - glossary : glossaire de la série (optionnel), seules les entrées présentes dans texts sont ajoutées au prompt
+    - source : chemin de la page, pour que le glossaire ne compte ses termes qu'une fois
+
+    Returns:
+    - list[str] : traductions, même longueur que texts
+    """
+    # Glossaire de la série : seuls les termes présents dans cette page sont ajoutés au prompt
+    glossary_hint = ""
+    if glossary is not None:
+        glossary.observe(texts, source)
+        glossary.pin_new_terms(model=model)
+        glossary_hint = glossary.prompt_section(texts)
+
+    prompt = """You translate English phrases into French in a natural and fluent style for webtoon dialogue.
+    Instruction: ONLY output a list containing the French translations of the given texts, in natural and fluent dialogue. Do not add explanations, notes, line breaks, or extra formatting. Remove or ignore any OCR artifacts like /, #, or other errors. If you absolutely do not know how to translate a word or phrase, leave it as-is. """+glossary_hint+json.dumps(texts, ensure_ascii=False)
+    system_prompt = f"You translate English phrases into French in a natural and fluent style for webtoon dialogue. ONLY output a list containing the French translations of the given texts. The list must have the same length as the original list, that is, {len(texts)} elements."
+
+    l_translated_upper = []
+    while len(l_translated_upper) != len(texts):  # On vérifie que l'on a bien une traduction pour chaque élément
+        r = ollama_llm(prompt, system_prompt, model=model)
+        l_translated = json.loads(r)
+        l_translated_upper = [s.upper() for s in l_translated]
+        print(l_translated_upper)
+
+    return l_translated_upper